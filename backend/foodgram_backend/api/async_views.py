@@ -0,0 +1,65 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+from .metrics import collect_queries
+
+# Маршруты чтения с наибольшей нагрузкой, которые в ASGI-режиме
+# обслуживаются асинхронными представлениями.
+HOT_ROUTES = (
+    "recipe-list",
+    "recipe-detail",
+    "recipe-download-shopping-cart",
+    "ingredient-list",
+    "ingredient-detail",
+    "tag-list",
+    "tag-detail",
+)
+
+
+def pooled_view(view):
+    """Асинхронная обертка синхронного представления DRF.
+
+    Django 3.2 не умеет обращаться к БД асинхронно, а синхронные
+    представления под ASGI по умолчанию выполняются в одном общем потоке.
+    Обертка запускает представление в пуле потоков (размер задается
+    переменной окружения ASGI_THREADS), не блокируя цикл событий.
+    Соединения с БД привязаны к потокам пула и переиспользуются между
+    запросами в пределах CONN_MAX_AGE.
+
+    Django 3.2 читает потоковый ответ в цикле событий, где обращения
+    к БД запрещены, поэтому потоковые представления на этих маршрутах
+    должны выполнять запросы до возврата ответа (при API_ASYNC_VIEWS).
+    """
+
+    def run(request, *args, **kwargs):
+        close_old_connections()
+        try:
+            with collect_queries():
+                response = view(request, *args, **kwargs)
+                if hasattr(response, "render"):
+                    response.render()
+                return response
+        finally:
+            close_old_connections()
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await sync_to_async(run, thread_sensitive=False)(
+            request, *args, **kwargs)
+
+    return async_view
+
+
+def pooled_urlpatterns(urlpatterns, routes=HOT_ROUTES):
+    """Замена представлений перечисленных маршрутов на асинхронные."""
+    return [
+        URLPattern(
+            pattern.pattern, pooled_view(pattern.callback),
+            pattern.default_args, pattern.name)
+        if isinstance(pattern, URLPattern) and pattern.name in routes
+        else pattern
+        for pattern in urlpatterns
+    ]
@@ -0,0 +1,104 @@
+import copy
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenLRUCache:
+    """Ограниченный по размеру LRU-кэш процесса с временем жизни записей."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenLRUCache(
+    getattr(settings, "TOKEN_CACHE_SIZE", 1024),
+    getattr(settings, "TOKEN_CACHE_TTL", 60))
+
+
+def _cache_key(key):
+    return "token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _shared_cache():
+    alias = getattr(settings, "TOKEN_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def invalidate_token(key):
+    """Метод удаления токена из кэша процесса и общего кэша."""
+    cache_key = _cache_key(key)
+    token_cache.delete(cache_key)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(cache_key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшированием пары токен-пользователь.
+
+    Пара хранится в LRU-кэше процесса. Если задан общий кэш
+    TOKEN_CACHE_ALIAS, в нем по ключу токена лежит только метка версии,
+    которая проверяется при каждом запросе: сигналы удаляют метку при
+    удалении токена и изменении пользователя, и запись процесса с
+    другой версией перечитывается из БД во всех процессах. Без общего
+    кэша запись процесса живет не дольше TOKEN_CACHE_TTL секунд.
+    Каждый запрос получает свою копию объекта пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        shared = _shared_cache()
+        version = shared.get(cache_key) if shared is not None else None
+        cached = token_cache.get(cache_key)
+        if cached is None or cached[2] != version:
+            user, token = super().authenticate_credentials(key)
+            if shared is not None and version is None:
+                version = uuid.uuid4().hex
+                shared.set(cache_key, version, getattr(
+                    settings, "TOKEN_SHARED_CACHE_TTL", 300))
+            cached = (user, token, version)
+            token_cache.set(cache_key, cached)
+        user, token = cached[:2]
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _("User inactive or deleted."))
+        return copy.copy(user), token
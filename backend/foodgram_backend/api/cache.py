@@ -0,0 +1,131 @@
+import hashlib
+import threading
+import uuid
+from collections import Counter
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+RECIPES = "recipes"
+TAGS = "tags"
+INGREDIENTS = "ingredients"
+FACETS = "facets"
+FAVORITES = "favorites"
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+def get_cache():
+    return caches[getattr(settings, "API_CACHE_ALIAS", "default")]
+
+
+def is_cache_enabled():
+    """Метод проверки, что ответы API кэшируются в общем кэше."""
+    return getattr(settings, "API_CACHE_ENABLED", True)
+
+
+def get_cache_stats():
+    """Метод получения счетчиков попаданий и промахов кэша процесса."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _count(namespace, result):
+    with _stats_lock:
+        _stats[f"{namespace}.{result}"] += 1
+
+
+def _get_versions(cache, namespaces):
+    """Метод получения текущих версий пространств имен кэша."""
+    keys = [f"version:{namespace}" for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def user_namespace(namespace, user_id):
+    """Метод получения пространства имен данных одного пользователя."""
+    return f"{namespace}:user:{user_id}"
+
+
+def get_versions(*namespaces):
+    """Метод получения отпечатка версий пространств имен кэша."""
+    return ":".join(_get_versions(get_cache(), namespaces))
+
+
+def get_or_set(namespaces, parts, compute):
+    """Метод получения значения из кэша или его вычисления.
+
+    Ключ строится так же, как в cache_response: из версий пространств
+    имен и переданных частей. Если кэш выключен, значение вычисляется.
+    """
+    if not is_cache_enabled():
+        return compute()
+    cache = get_cache()
+    raw_key = ":".join(_get_versions(cache, namespaces) + list(parts))
+    key = "value:" + hashlib.md5(raw_key.encode()).hexdigest()
+    value = cache.get(key)
+    if value is not None:
+        _count(namespaces[0], "hits")
+        return value
+    _count(namespaces[0], "misses")
+    value = compute()
+    cache.set(key, value)
+    return value
+
+
+def invalidate(*namespaces):
+    """Метод сброса закэшированных ответов пространств имен."""
+    cache = get_cache()
+    cache.set_many(
+        {f"version:{namespace}": uuid.uuid4().hex
+         for namespace in namespaces}, None)
+
+
+def cache_response(*namespaces, anonymous_only=False, key_method=None):
+    """Декоратор кэширования данных ответа GET-метода вьюсета.
+
+    Ключ строится из версий пространств имен, схемы и хоста запроса,
+    пути и отсортированных параметров запроса: хост и схема входят в
+    абсолютные ссылки ответа. Смена версии через invalidate() делает
+    устаревшими все ответы пространства имен. Метод вьюсета key_method
+    с сигнатурой метода ответа добавляет в ключ версию объекта, чтобы
+    изменение, сброс кэша после которого не дошел, не отдавалось из
+    кэша.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if not is_cache_enabled() or (
+                    anonymous_only and not request.user.is_anonymous):
+                return method(self, request, *args, **kwargs)
+            cache = get_cache()
+            query = urlencode(sorted(request.query_params.lists()), True)
+            parts = [request.scheme, request.get_host(), request.path, query]
+            if key_method:
+                parts.append(str(getattr(self, key_method)(
+                    request, *args, **kwargs)))
+            raw_key = ":".join(_get_versions(cache, namespaces) + parts)
+            key = "response:" + hashlib.md5(raw_key.encode()).hexdigest()
+            data = cache.get(key)
+            if data is not None:
+                _count(namespaces[0], "hits")
+                response = Response(data)
+                response["X-Cache"] = "HIT"
+                return response
+            _count(namespaces[0], "misses")
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data)
+            response["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,36 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+
+def conditional_response(state_method):
+    """Декоратор условных GET-запросов по ETag и Last-Modified.
+
+    Метод вьюсета state_method(request, *args, **kwargs) возвращает пару
+    (строка состояния, дата изменения или None) либо None, если
+    состояние получить нельзя. Ответ 304 отдается до сериализации.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            state = getattr(self, state_method)(request, *args, **kwargs)
+            if state is None:
+                return method(self, request, *args, **kwargs)
+            source, modified = state
+            etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+            last_modified = int(modified.timestamp()) if modified else None
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                return not_modified
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response["ETag"] = etag
+                if last_modified is not None:
+                    response["Last-Modified"] = http_date(last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,55 @@
+from django.db.models import Count, Q
+
+from recipes.models import Tag
+from .cache import FACETS, get_or_set, get_versions, user_namespace
+from .filters import RecipeFilter
+
+FACETS_QUERY_PARAM = "facets"
+TAG_FACETS = "tags"
+FACET_PARAMS = ("author", "is_favorited", "is_in_shopping_cart", "search")
+USER_FACET_PARAMS = ("is_favorited", "is_in_shopping_cart")
+
+
+def facets_requested(request):
+    return TAG_FACETS in request.query_params.getlist(FACETS_QUERY_PARAM)
+
+
+def get_facet_namespaces(request):
+    """Метод получения пространств имен кэша счетчиков запроса."""
+    namespaces = [FACETS]
+    user = request.user
+    if not user.is_anonymous and any(
+            param in request.query_params for param in USER_FACET_PARAMS):
+        namespaces.append(user_namespace(FACETS, user.pk))
+    return namespaces
+
+
+def get_facets_version(request):
+    """Метод получения версии счетчиков для отпечатка условного запроса."""
+    return get_versions(*get_facet_namespaces(request))
+
+
+def get_tag_facets(request, queryset):
+    """Метод подсчета рецептов по тегам для текущих фильтров.
+
+    Выбор тегов в подсчете не учитывается, чтобы счетчики показывали,
+    сколько рецептов будет у каждого тега. Все теги считаются одним
+    сгруппированным запросом, результат кэшируется до изменения тегов
+    рецептов, а при фильтрах по избранному и покупкам - еще и до
+    изменения этих списков пользователя.
+    """
+    params = request.query_params.copy()
+    params.pop("tags", None)
+    params.pop("tags[]", None)
+    parts = [f"{param}={params.getlist(param)}" for param in FACET_PARAMS]
+    namespaces = get_facet_namespaces(request)
+    if len(namespaces) > 1:
+        parts.append(f"user={request.user.pk}")
+
+    def compute():
+        recipes = RecipeFilter(
+            params, queryset=queryset, request=request).qs.order_by()
+        return list(Tag.objects.values("id", "name", "slug").annotate(
+            count=Count("tags", filter=Q(tags__in=recipes.values("pk")))))
+
+    return get_or_set(namespaces, parts, compute)
@@ -0,0 +1,42 @@
+from django.db.models import Exists, OuterRef
+from django_filters import rest_framework as filters
+from django_filters.widgets import QueryArrayWidget
+
+from recipes.models import Favorite, Recipe, ShoppingList
+
+
+class RecipeFilter(filters.FilterSet):
+    """Фильтр рецептов по автору, тегам, избранному и списку покупок.
+
+    Теги, избранное и список покупок проверяются подзапросами EXISTS,
+    поэтому строки рецептов не размножаются и DISTINCT не нужен.
+    Несколько тегов объединяются через ИЛИ: ?tags=breakfast&tags=lunch.
+    """
+    author = filters.NumberFilter(field_name="author_id")
+    tags = filters.Filter(method="filter_tags", widget=QueryArrayWidget)
+    is_favorited = filters.BooleanFilter(method="filter_is_favorited")
+    is_in_shopping_cart = filters.BooleanFilter(
+        method="filter_is_in_shopping_cart")
+
+    class Meta:
+        model = Recipe
+        fields = ("author", "tags", "is_favorited", "is_in_shopping_cart")
+
+    def filter_tags(self, queryset, name, value):
+        """Метод фильтрации по слагам тегов."""
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef("pk"), tag__slug__in=value)))
+
+    def filter_by_user(self, queryset, model, value):
+        """Метод фильтрации по наличию рецепта в списке пользователя."""
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.none() if value else queryset
+        exists = Exists(model.objects.filter(user=user, recipe=OuterRef("pk")))
+        return queryset.filter(exists if value else ~exists)
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_by_user(queryset, Favorite, value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_by_user(queryset, ShoppingList, value)
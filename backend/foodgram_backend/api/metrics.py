@@ -0,0 +1,232 @@
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы общего времени запроса, мс.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = ContextVar("request_metrics", default=None)
+_histogram_lock = threading.Lock()
+_histograms = {}
+
+
+class RequestMetrics:
+    """Метрики одного запроса: запросы к БД и время этапов."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.total_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self):
+        return ", ".join((
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f"serializer;dur={self.serializer_time * 1000:.1f}",
+            f"total;dur={self.total_time * 1000:.1f}",
+        ))
+
+
+class TimedSerializerMixin:
+    """Примесь сериализатора, учитывающая время to_representation.
+
+    Вложенные сериализаторы не учитываются повторно: время считается
+    только на внешнем уровне вложенности.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None:
+            return super().to_representation(instance)
+        metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_depth -= 1
+            if not metrics.serializer_depth:
+                metrics.serializer_time += time.perf_counter() - started
+
+
+def get_endpoint_name(request):
+    """Имя эндпоинта: метод и имя маршрута, например GET recipes-list."""
+    match = getattr(request, "resolver_match", None)
+    name = match.view_name if match else "unresolved"
+    return f"{request.method} {name}"
+
+
+def get_query_budget(endpoint):
+    """Допустимое количество запросов к БД для эндпоинта или None."""
+    return getattr(settings, "QUERY_BUDGETS", {}).get(endpoint)
+
+
+def _record(endpoint, metrics):
+    with _histogram_lock:
+        stats = _histograms.get(endpoint)
+        if stats is None:
+            stats = _histograms[endpoint] = {
+                "count": 0,
+                "buckets": [0] * (len(BUCKETS) + 1),
+                "total_ms": 0.0,
+                "db_ms": 0.0,
+                "serializer_ms": 0.0,
+                "queries": 0,
+                "max_queries": 0,
+                "over_budget": 0,
+            }
+        total_ms = metrics.total_time * 1000
+        stats["count"] += 1
+        stats["buckets"][bisect.bisect_left(BUCKETS, total_ms)] += 1
+        stats["total_ms"] += total_ms
+        stats["db_ms"] += metrics.db_time * 1000
+        stats["serializer_ms"] += metrics.serializer_time * 1000
+        stats["queries"] += metrics.queries
+        stats["max_queries"] = max(stats["max_queries"], metrics.queries)
+        budget = get_query_budget(endpoint)
+        if budget is not None and metrics.queries > budget:
+            stats["over_budget"] += 1
+
+
+def get_metrics():
+    """Метод получения гистограмм и средних значений по эндпоинтам."""
+    with _histogram_lock:
+        histograms = {
+            endpoint: {**stats, "buckets": list(stats["buckets"])}
+            for endpoint, stats in _histograms.items()}
+    result = {}
+    for endpoint, stats in sorted(histograms.items()):
+        count = stats["count"]
+        result[endpoint] = {
+            "count": count,
+            "query_budget": get_query_budget(endpoint),
+            "over_budget": stats["over_budget"],
+            "max_queries": stats["max_queries"],
+            "avg_queries": round(stats["queries"] / count, 2),
+            "avg_total_ms": round(stats["total_ms"] / count, 2),
+            "avg_db_ms": round(stats["db_ms"] / count, 2),
+            "avg_serializer_ms": round(stats["serializer_ms"] / count, 2),
+            "histogram_ms": {
+                **{f"le_{bound}": stats["buckets"][index]
+                   for index, bound in enumerate(BUCKETS)},
+                "inf": stats["buckets"][-1],
+            },
+        }
+    return result
+
+
+def reset_metrics():
+    """Метод сброса накопленных гистограмм процесса."""
+    with _histogram_lock:
+        _histograms.clear()
+
+
+@contextmanager
+def collect_queries():
+    """Учет запросов к БД текущего потока в метриках текущего запроса.
+
+    В ASGI-режиме представления выполняются в пуле потоков, у каждого
+    потока свои соединения, поэтому обертка ставится внутри потока.
+    """
+    metrics = _current.get()
+    with ExitStack() as stack:
+        if metrics is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+        yield
+
+
+class RequestMetricsMiddleware:
+    """Middleware учета запросов к БД и времени обработки запроса.
+
+    Результат добавляется в заголовок Server-Timing, накапливается
+    в гистограммах процесса и сохраняется в response.metrics.
+    Поддерживает синхронный и асинхронный режимы обработки.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "REQUEST_METRICS_ENABLED", True)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with collect_queries():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def finish(self, request, response, metrics, started):
+        metrics.total_time = time.perf_counter() - started
+        endpoint = get_endpoint_name(request)
+        _record(endpoint, metrics)
+        budget = get_query_budget(endpoint)
+        if budget is not None and metrics.queries > budget:
+            logger.warning(
+                "%s: %s запросов к БД при бюджете %s",
+                endpoint, metrics.queries, budget)
+        response["Server-Timing"] = metrics.server_timing()
+        response.metrics = metrics
+        response.endpoint = endpoint
+        return response
+
+
+def assert_query_budget(response, budget=None):
+    """Проверка ответа тестового клиента на превышение бюджета запросов.
+
+    Бюджет берется из аргумента или из настройки QUERY_BUDGETS по имени
+    эндпоинта. Требует включенного RequestMetricsMiddleware.
+    """
+    metrics = getattr(response, "metrics", None)
+    if metrics is None:
+        raise AssertionError(
+            "В ответе нет метрик, подключите RequestMetricsMiddleware.")
+    if budget is None:
+        budget = get_query_budget(response.endpoint)
+    if budget is None:
+        raise AssertionError(
+            f"Для {response.endpoint} не задан бюджет в QUERY_BUDGETS.")
+    if metrics.queries > budget:
+        raise AssertionError(
+            f"{response.endpoint}: {metrics.queries} запросов к БД "
+            f"при бюджете {budget}.")
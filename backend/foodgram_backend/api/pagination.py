@@ -0,0 +1,174 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+CURSOR_MODE = "cursor"
+
+
+class KeysetPagination(PageNumberPagination):
+    """Постраничная пагинация с необязательным режимом курсора.
+
+    Режим курсора включается параметром pagination=cursor и выбирает
+    страницу по ключу без OFFSET и без COUNT(*). Ключ строится из
+    сортировки queryset (в том числе заданной параметром ordering или
+    ранжированием поиска) и последнего поля keyset_fields, которое
+    делает его уникальным; без сортировки используется keyset_fields.
+    Общее количество объектов возвращается только при with_count=true.
+    """
+    keyset_fields = ("-id",)
+    mode_query_param = "pagination"
+    cursor_query_param = "cursor"
+    count_query_param = "with_count"
+    invalid_cursor_message = "Неверный курсор."
+    invalid_ordering_message = (
+        "Сортировка по {field} не поддерживается в режиме курсора.")
+
+    def is_keyset_mode(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == CURSOR_MODE
+            or self.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_mode = self.is_keyset_mode(request)
+        if not self.keyset_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        with_count = request.query_params.get(
+            self.count_query_param, "").lower() in ("1", "true")
+        self.count = queryset.count() if with_count else None
+
+        fields = self.get_keyset_fields(queryset)
+        queryset = queryset.order_by(*(field for field, _ in fields))
+        position = self.decode_cursor(request, fields)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(fields, position))
+
+        results = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next_position = [
+                getattr(results[-1], field.lstrip("-"))
+                for field, _ in fields]
+        return results
+
+    def get_keyset_fields(self, queryset):
+        """Метод получения полей ключа курсора и их типов.
+
+        Возвращает пары (поле сортировки, поле модели или аннотации),
+        тип нужен для разбора значений из курсора.
+        """
+        ordering = list(queryset.query.order_by) or list(self.keyset_fields)
+        tiebreaker = self.keyset_fields[-1]
+        if tiebreaker.lstrip("-") not in (
+                str(field).lstrip("-") for field in ordering):
+            ordering.append(tiebreaker)
+        opts = queryset.model._meta
+        fields = []
+        for field in ordering:
+            if not isinstance(field, str) or "__" in field or field == "?":
+                raise ValidationError(
+                    self.invalid_ordering_message.format(field=field))
+            name = field.lstrip("-")
+            if name == "pk":
+                name = opts.pk.name
+                field = field.replace("pk", name)
+            if name in queryset.query.annotations:
+                model_field = queryset.query.annotations[name].output_field
+            else:
+                try:
+                    model_field = opts.get_field(name)
+                except FieldDoesNotExist:
+                    raise ValidationError(
+                        self.invalid_ordering_message.format(field=field))
+            fields.append((field, model_field))
+        return fields
+
+    def get_keyset_filter(self, fields, position):
+        """Метод построения условия "после позиции" для ключа курсора."""
+        keyset_filter = Q()
+        equal = {}
+        for (field, _), value in zip(fields, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            keyset_filter |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return keyset_filter
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if hasattr(value, "isoformat") else value
+                  for value in position]
+        return base64.urlsafe_b64encode(
+            json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, request, fields):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(fields):
+                raise ValueError
+            return [model_field.to_python(value)
+                    for (_, model_field), value in zip(fields, values)]
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.keyset_mode:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = replace_query_param(
+            self.request.build_absolute_uri(),
+            self.mode_query_param, CURSOR_MODE)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        if not self.keyset_mode:
+            return super().get_paginated_response(data)
+        response = OrderedDict()
+        if self.count is not None:
+            response["count"] = self.count
+        response["next"] = self.get_next_link()
+        response["previous"] = None
+        response["results"] = data
+        return Response(response)
+
+
+class RecipePagination(KeysetPagination):
+    """Пагинация ленты рецептов по ключу (pub_date, id)."""
+    keyset_fields = ("-pub_date", "-id")
+
+
+class SubscriptionPagination(KeysetPagination):
+    """Пагинация подписок по идентификатору подписки."""
+    keyset_fields = ("id",)
+
+
+class FeedPagination(KeysetPagination):
+    """Пагинация ленты подписок по ключу (pub_date, recipe_id).
+
+    Лента всегда отдается в режиме курсора: страница читается одним
+    проходом по индексу ленты пользователя без COUNT(*) и OFFSET.
+    """
+    keyset_fields = ("-pub_date", "-recipe_id")
+
+    def is_keyset_mode(self, request):
+        return True
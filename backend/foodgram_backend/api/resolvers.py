@@ -0,0 +1,102 @@
+from collections import defaultdict
+
+from recipes.models import (Favorite, Recipe, RecipeIngredients,
+                            ShoppingList, Subscription)
+
+SUBSCRIPTION_RECIPE_FIELDS = (
+    "id", "author_id", "name", "image", "image_variants", "cooking_time",
+    "pub_date")
+
+TOP_RECIPES_BY_AUTHOR = """
+SELECT {columns} FROM (
+    SELECT {columns}, ROW_NUMBER() OVER (
+        PARTITION BY author_id ORDER BY pub_date DESC, id DESC
+    ) AS position
+    FROM {table}
+    WHERE author_id IN ({authors})
+) AS ranked
+WHERE position <= %s
+ORDER BY author_id, pub_date DESC, id DESC
+"""
+
+
+class RecipeBatchResolver:
+    """Пакетное получение данных пользователя для страницы рецептов.
+
+    Заполняется один раз на страницу и передается сериализаторам
+    через контекст под ключом "batch".
+    """
+
+    def __init__(self, user, recipes):
+        recipe_ids = [recipe.id for recipe in recipes]
+        author_ids = {recipe.author_id for recipe in recipes}
+        self.favorited = set()
+        self.in_shopping_cart = set()
+        self.subscribed = set()
+        if not user.is_anonymous:
+            self.favorited = set(Favorite.objects.filter(
+                user=user, recipe_id__in=recipe_ids).values_list(
+                "recipe_id", flat=True))
+            self.in_shopping_cart = set(ShoppingList.objects.filter(
+                user=user, recipe_id__in=recipe_ids).values_list(
+                "recipe_id", flat=True))
+            self.subscribed = set(Subscription.objects.filter(
+                user=user, subscribing_id__in=author_ids).values_list(
+                "subscribing_id", flat=True))
+        self.ingredients = defaultdict(list)
+        rows = RecipeIngredients.objects.filter(
+            recipe_id__in=recipe_ids).order_by(
+            "ingredient__name").values_list(
+            "recipe_id", "ingredient_id", "ingredient__name",
+            "ingredient__measurement_unit", "amount")
+        for recipe_id, pk, name, measurement_unit, amount in rows:
+            self.ingredients[recipe_id].append({
+                "id": pk,
+                "name": name,
+                "measurement_unit": measurement_unit,
+                "amount": amount})
+
+    def is_favorited(self, recipe):
+        return recipe.id in self.favorited
+
+    def is_in_shopping_cart(self, recipe):
+        return recipe.id in self.in_shopping_cart
+
+    def is_subscribed(self, author):
+        return author.id in self.subscribed
+
+    def get_ingredients(self, recipe):
+        return self.ingredients.get(recipe.id, [])
+
+
+class SubscriptionRecipesResolver:
+    """Пакетное получение рецептов авторов для страницы подписок.
+
+    Последние limit рецептов каждого автора выбираются одним запросом
+    с ROW_NUMBER() OVER (PARTITION BY author_id), без limit - одним
+    запросом по всем авторам. Передается сериализатору через контекст
+    под ключом "recipes_batch".
+    """
+
+    def __init__(self, author_ids, limit=None):
+        self.recipes = defaultdict(list)
+        author_ids = sorted(set(author_ids))
+        if not author_ids or limit == 0:
+            return
+        if limit is None:
+            recipes = Recipe.objects.filter(
+                author_id__in=author_ids).only(
+                *SUBSCRIPTION_RECIPE_FIELDS).order_by(
+                "author_id", "-pub_date", "-id")
+        else:
+            recipes = Recipe.objects.raw(
+                TOP_RECIPES_BY_AUTHOR.format(
+                    columns=", ".join(SUBSCRIPTION_RECIPE_FIELDS),
+                    table=Recipe._meta.db_table,
+                    authors=", ".join(["%s"] * len(author_ids))),
+                [*author_ids, limit])
+        for recipe in recipes:
+            self.recipes[recipe.author_id].append(recipe)
+
+    def get_recipes(self, author_id):
+        return self.recipes.get(author_id, [])
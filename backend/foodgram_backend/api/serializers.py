@@ -1,11 +1,17 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models import F
+from django.db.models.functions import Lower
 from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers
 
-from recipes.fields import Base64ImageField
+from recipes.fields import Base64ImageField, RecipeImageField
+from recipes.images import get_image_status
+from recipes.indexes import recipe_ingredient_index
 from recipes.models import (Ingredient, Recipe, RecipeIngredients,
                             Subscription, Tag)
+from recipes.search import update_search_vector
+from .metrics import TimedSerializerMixin
 
 User = get_user_model()
 
@@ -20,7 +26,7 @@ class UserSigninSerializer(UserCreateSerializer):
                   "username", "email")
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор на основе модели пользователя."""
     is_subscribed = serializers.SerializerMethodField()
 
@@ -30,13 +36,19 @@ class UserSerializer(serializers.ModelSerializer):
                   "first_name", "last_name", "is_subscribed")
 
     def get_is_subscribed(self, username):
+        batch = self.context.get("batch")
+        if batch is not None:
+            return batch.is_subscribed(username)
         user = self.context["request"].user
         return (not user.is_anonymous and Subscription.objects.filter(
                 user=user, subscribing=username).exists())
 
 
-class SubscribeRecipeSerializer(serializers.ModelSerializer):
+class SubscribeRecipeSerializer(TimedSerializerMixin,
+                                serializers.ModelSerializer):
     """Сериализатор для подписки на рецепты."""
+    image = RecipeImageField(variant="thumb")
+
     class Meta:
         model = Recipe
         fields = ("id", "name", "image", "cooking_time")
@@ -64,18 +76,22 @@ class SubscriptionSerializer(UserSerializer):
 
     def get_recipes(self, obj):
         """Метод получения рецептов для подписки."""
-        request = self.context.get("request")
-        limit = request.GET.get("recipes_limit")
-        recipes = (obj.subscribing.recipe.all()[:int(limit)]
-                   if limit else obj.subscribing.recipe.all())
+        batch = self.context.get("recipes_batch")
+        if batch is not None:
+            recipes = batch.get_recipes(obj.subscribing_id)
+        else:
+            recipes = obj.subscribing.recipe.all()
+            limit = self.context.get("recipes_limit")
+            if limit is not None:
+                recipes = recipes[:limit]
         return SubscribeRecipeSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
         """Метод получения количества рецептов для подписки."""
-        return obj.subscribing.recipe.count()
+        return obj.subscribing.recipes_count
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор на основе модели тега."""
 
     class Meta:
@@ -84,7 +100,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ("slug", "color")
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор на основе модели ингредиента."""
 
     class Meta:
@@ -121,9 +137,9 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     def validate_name(self, name):
         """Метод валидации для поля названия рецепта."""
         name = name.capitalize()
-        is_exist = Recipe.objects.filter(
+        is_exist = Recipe.objects.annotate(lower_name=Lower("name")).filter(
             author=self.context["request"].user,
-            name__iexact=name).exists()
+            lower_name=name.lower()).exists()
         if is_exist and self.context["request"].method == "POST":
             raise serializers.ValidationError(
                 "Рецепт с таким названием уже существует.")
@@ -136,16 +152,15 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Список ингредиентов не может быть пустым!")
 
-        ingredients_list = []
-        for item in ingredients:
-            ingredient_id = item["id"]
-            if not Ingredient.objects.filter(id=ingredient_id).exists():
-                raise serializers.ValidationError(
-                    "Передан несуществующий ингредиент!")
-            if ingredient_id in ingredients_list:
-                raise serializers.ValidationError(
-                    "Ингредиенты не могут повторяться!")
-            ingredients_list.append(ingredient_id)
+        ingredient_ids = [item["id"] for item in ingredients]
+        unique_ids = set(ingredient_ids)
+        if Ingredient.objects.filter(
+                id__in=unique_ids).count() != len(unique_ids):
+            raise serializers.ValidationError(
+                "Передан несуществующий ингредиент!")
+        if len(unique_ids) != len(ingredient_ids):
+            raise serializers.ValidationError(
+                "Ингредиенты не могут повторяться!")
         return data
 
     def validate_text(self, text):
@@ -157,12 +172,47 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
     def add_list_ingredients(self, recipe, ingredients):
         """Метод создания списка ингредиентов для рецепта."""
-        for ingredient in ingredients:
-            RecipeIngredients.objects.create(
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
                 ingredient_id=ingredient.get("id"),
                 amount=ingredient.get("amount"),
                 recipe=recipe)
-
+            for ingredient in ingredients)
+
+    def reindex_ingredients(self, recipe, ingredients):
+        """Метод обновления инвертированного индекса после сохранения."""
+        ingredient_ids = [ingredient.get("id") for ingredient in ingredients]
+        transaction.on_commit(lambda: recipe_ingredient_index.set_recipe(
+            recipe.pk, ingredient_ids))
+
+    def update_list_ingredients(self, recipe, ingredients):
+        """Метод обновления только изменившихся ингредиентов рецепта."""
+        current = {
+            item.ingredient_id: item
+            for item in recipe.recipe_ingredients.all()}
+        amounts = {
+            ingredient.get("id"): ingredient.get("amount")
+            for ingredient in ingredients}
+
+        removed = current.keys() - amounts.keys()
+        if removed:
+            recipe.recipe_ingredients.filter(
+                ingredient_id__in=removed).delete()
+
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        if changed:
+            RecipeIngredients.objects.bulk_update(changed, ("amount",))
+
+        self.add_list_ingredients(recipe, [
+            ingredient for ingredient in ingredients
+            if ingredient.get("id") not in current])
+
+    @transaction.atomic
     def create(self, validated_data):
         """Метод создания нового рецепта."""
         ingredients = validated_data.pop("ingredients")
@@ -171,17 +221,21 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         recipe.tags.set(tags)
         self.add_list_ingredients(recipe, ingredients)
         recipe.save()
+        update_search_vector(Recipe.objects.filter(pk=recipe.pk))
+        self.reindex_ingredients(recipe, ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Метод обновления рецепта."""
         ingredients = validated_data.pop("ingredients")
         tags = validated_data.pop("tags")
         super().update(instance, validated_data)
-        instance.ingredients.clear()
         instance.tags.set(tags)
-        self.add_list_ingredients(instance, ingredients)
+        self.update_list_ingredients(instance, ingredients)
         instance.save()
+        update_search_vector(Recipe.objects.filter(pk=instance.pk))
+        self.reindex_ingredients(instance, ingredients)
         return instance
 
     def to_representation(self, instance):
@@ -191,25 +245,29 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return RecipeInfoSerializer(instance, context=context).data
 
 
-class RecipeInfoSerializer(serializers.ModelSerializer):
+class RecipeInfoSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для получения рецепта."""
     author = UserSerializer(read_only=True)
     ingredients = serializers.SerializerMethodField()
-    image = Base64ImageField()
+    image = RecipeImageField()
     tags = TagSerializer(read_only=True, many=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    image_status = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ("id", "tags", "author", "ingredients", "is_favorited",
-                  "is_in_shopping_cart", "name", "image", "text",
-                  "cooking_time")
+                  "is_in_shopping_cart", "name", "image", "image_status",
+                  "text", "cooking_time")
         read_only_fields = ("id", "author", "is_favorited",
                             "is_in_shopping_cart")
 
     def get_ingredients(self, recipe):
         """Метод получения ингредиентов в рецепте."""
+        batch = self.context.get("batch")
+        if batch is not None:
+            return batch.get_ingredients(recipe)
         ingredients = recipe.ingredients.values(
             "id",
             "name",
@@ -217,8 +275,15 @@ class RecipeInfoSerializer(serializers.ModelSerializer):
             amount=F("recipe_ingredients__amount"))
         return ingredients
 
+    def get_image_status(self, recipe):
+        """Метод получения состояния обработки изображения."""
+        return get_image_status(recipe)
+
     def get_is_favorited(self, recipe):
         """Метод проверки рецепта в списке избранного."""
+        batch = self.context.get("batch")
+        if batch is not None:
+            return batch.is_favorited(recipe)
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
@@ -226,14 +291,32 @@ class RecipeInfoSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, recipe):
         """Метод проверки рецепта в списке покупок."""
+        batch = self.context.get("batch")
+        if batch is not None:
+            return batch.is_in_shopping_cart(recipe)
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
         return user.shopping_list.filter(recipe=recipe.id).exists()
 
 
-class ActionRecipeSerializer(serializers.ModelSerializer):
+class RecipeMatchSerializer(RecipeInfoSerializer):
+    """Сериализатор рецепта с долей имеющихся ингредиентов."""
+    coverage = serializers.SerializerMethodField()
+
+    class Meta(RecipeInfoSerializer.Meta):
+        fields = RecipeInfoSerializer.Meta.fields + ("coverage",)
+
+    def get_coverage(self, recipe):
+        """Метод получения доли имеющихся ингредиентов рецепта."""
+        return round(self.context["coverage"][recipe.id], 4)
+
+
+class ActionRecipeSerializer(TimedSerializerMixin,
+                             serializers.ModelSerializer):
     """Сериализатор на основе модели рецепта для методов action."""
+    image = RecipeImageField(variant="thumb")
+
     class Meta:
         model = Recipe
         fields = ("id", "name", "image", "cooking_time")
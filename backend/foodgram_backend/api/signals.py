@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingList, Tag
+from .authentication import invalidate_token
+from .cache import (FACETS, FAVORITES, INGREDIENTS, RECIPES, TAGS,
+                    invalidate, user_namespace)
+
+User = get_user_model()
+
+
+def invalidate_on_commit(*namespaces):
+    transaction.on_commit(lambda: invalidate(*namespaces))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    """Сброс кэша тегов и рецептов после изменения тега."""
+    invalidate_on_commit(TAGS, RECIPES, FACETS)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    """Сброс кэша ингредиентов и рецептов после изменения ингредиента."""
+    invalidate_on_commit(INGREDIENTS, RECIPES, FACETS)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipes(sender, **kwargs):
+    """Сброс кэша рецептов после изменения рецепта или его состава."""
+    invalidate_on_commit(RECIPES, FACETS)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def invalidate_favorites(sender, **kwargs):
+    """Смена версии избранного для списков с сортировкой по счетчику."""
+    invalidate_on_commit(FAVORITES)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingList)
+def invalidate_user_facets(sender, instance, **kwargs):
+    """Сброс счетчиков тегов по избранному и покупкам пользователя."""
+    invalidate_on_commit(user_namespace(FACETS, instance.user_id))
+
+
+@receiver(post_save, sender=User)
+def invalidate_authors(sender, update_fields=None, **kwargs):
+    """Сброс кэша рецептов после изменения данных автора."""
+    if update_fields and set(update_fields) <= {"last_login", "password"}:
+        return
+    invalidate_on_commit(RECIPES)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Сброс кэша аутентификации после удаления токена (logout).
+
+    Ключ сохраняется заранее: после удаления Django обнуляет первичный
+    ключ объекта, а у токена это и есть поле key.
+    """
+    key = instance.key
+    transaction.on_commit(lambda: invalidate_token(key))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """Сброс кэша аутентификации после изменения пользователя."""
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    keys = list(Token.objects.filter(
+        user_id=instance.pk).values_list("key", flat=True))
+
+    def invalidate_keys():
+        for key in keys:
+            invalidate_token(key)
+
+    if keys:
+        transaction.on_commit(invalidate_keys)
@@ -0,0 +1,385 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from recipes.models import (Favorite, FeedItem, Ingredient, Recipe,
+                            RecipeIngredients, ShoppingList, Subscription,
+                            Tag)
+from .authentication import _cache_key, _shared_cache
+from .cache import get_cache
+from .metrics import assert_query_budget
+from .pagination import RecipePagination
+
+User = get_user_model()
+
+
+class QueryCountTestCase(APITestCase):
+    """Базовый класс проверок количества запросов к БД."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="pass",
+            first_name="Иван", last_name="Иванов")
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass",
+            first_name="Петр", last_name="Петров")
+        cls.tag = Tag.objects.create(
+            name="Завтрак", color="#E26C2D", slug="breakfast")
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ингредиент {number}", measurement_unit="г")
+            for number in range(10))
+        cls.ingredients = list(Ingredient.objects.all())
+
+    def setUp(self):
+        get_cache().clear()
+        self.client.force_authenticate(self.user)
+
+    def create_recipes(self, count, author=None):
+        """Метод создания рецептов со всеми ингредиентами и тегом."""
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=author or self.author, name=f"Рецепт {number}",
+                   text="Описание рецепта", cooking_time=10)
+            for number in range(Recipe.objects.count(),
+                                Recipe.objects.count() + count))
+        recipes = list(Recipe.objects.filter(
+            name__in=[recipe.name for recipe in recipes]))
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(recipe=recipe, ingredient=ingredient, amount=2)
+            for recipe in recipes for ingredient in self.ingredients)
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=self.tag)
+            for recipe in recipes)
+        return recipes
+
+    def count_queries(self, path):
+        """Метод подсчета запросов с чтением потокового ответа."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+            content = (b"".join(response.streaming_content)
+                       if response.streaming else response.content)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), content
+
+
+class DownloadShoppingCartTest(QueryCountTestCase):
+    path = "/api/recipes/download_shopping_cart/"
+
+    def fill_cart(self, count):
+        ShoppingList.objects.filter(user=self.user).delete()
+        ShoppingList.objects.bulk_create(
+            ShoppingList(user=self.user, recipe=recipe)
+            for recipe in self.create_recipes(count))
+
+    def test_query_count_does_not_grow_with_cart(self):
+        self.fill_cart(1)
+        small, content = self.count_queries(self.path)
+        self.assertIn("Ингредиент 0, 2 г".encode(), content)
+
+        self.fill_cart(20)
+        large, content = self.count_queries(self.path)
+        self.assertIn("Ингредиент 0, 40 г".encode(), content)
+        self.assertEqual(small, large)
+        self.assertLessEqual(
+            large, 2, "Список покупок должен собираться одним запросом.")
+
+    @override_settings(API_ASYNC_VIEWS=True)
+    def test_asgi_stream_does_not_query_during_iteration(self):
+        self.fill_cart(3)
+        response = self.client.get(self.path)
+        with CaptureQueriesContext(connection) as queries:
+            content = b"".join(response.streaming_content)
+        self.assertEqual(len(queries), 0)
+        self.assertIn("Ингредиент 0, 6 г".encode(), content)
+
+
+class QueryBudgetTest(QueryCountTestCase):
+
+    def test_recipe_list(self):
+        self.create_recipes(10)
+        assert_query_budget(self.client.get("/api/recipes/"))
+
+    def test_recipe_detail(self):
+        recipe = self.create_recipes(1)[0]
+        assert_query_budget(self.client.get(f"/api/recipes/{recipe.pk}/"))
+
+    def test_subscriptions(self):
+        for number in range(5):
+            author = User.objects.create_user(
+                username=f"author{number}",
+                email=f"author{number}@example.com", password="pass",
+                first_name="Автор", last_name="Авторов")
+            self.create_recipes(3, author=author)
+            Subscription.objects.create(user=self.user, subscribing=author)
+        response = self.client.get(
+            "/api/users/subscriptions/?recipes_limit=2")
+        assert_query_budget(response)
+        self.assertEqual(
+            [len(item["recipes"]) for item in response.data["results"]],
+            [2] * 5)
+
+    def test_budget_exceeded(self):
+        response = self.client.get("/api/recipes/")
+        with self.assertRaises(AssertionError):
+            assert_query_budget(response, budget=0)
+
+
+class CacheResponseTest(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+        self.recipe = self.create_recipes(1)[0]
+        self.path = f"/api/recipes/{self.recipe.pk}/"
+
+    def rename_without_signals(self, name):
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            name=name, updated_at=timezone.now())
+
+    def test_disabled_with_local_memory_cache(self):
+        response = self.client.get(self.path)
+        self.assertNotIn("X-Cache", response)
+
+    @override_settings(API_CACHE_ENABLED=True)
+    def test_detail_key_includes_updated_at(self):
+        self.assertEqual(self.client.get(self.path)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(self.path)["X-Cache"], "HIT")
+        self.rename_without_signals("Новое название")
+        response = self.client.get(self.path)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["name"], "Новое название")
+
+
+@override_settings(API_CACHE_ENABLED=True)
+class RecipeListETagTest(QueryCountTestCase):
+    path = "/api/recipes/"
+
+    def setUp(self):
+        super().setUp()
+        self.recipes = self.create_recipes(3)
+
+    def get_etag(self, path=None):
+        response = self.client.get(path or self.path)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_not_modified_without_recipe_queries(self):
+        etag = self.get_etag()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any(
+            "recipes_recipe" in query["sql"] for query in queries))
+
+    def test_etag_changes_after_delete(self):
+        etag = self.get_etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[0].delete()
+        self.assertNotEqual(self.get_etag(), etag)
+
+    def test_etag_changes_after_favorite_with_ordering(self):
+        path = f"{self.path}?ordering=-favorites_count"
+        etag = self.get_etag(path)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.author, recipe=self.recipes[0])
+        self.assertNotEqual(self.get_etag(path), etag)
+
+    @override_settings(API_CACHE_ENABLED=False)
+    def test_no_etag_without_shared_cache(self):
+        self.assertNotIn("ETag", self.client.get(self.path))
+
+
+@override_settings(TOKEN_CACHE_ALIAS="api")
+class CachedTokenAuthenticationTest(QueryCountTestCase):
+    path = "/api/users/me/"
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")
+        self.assertEqual(self.client.get(self.path).status_code, 200)
+
+    def test_logout_rejects_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(self.path).status_code, 401)
+
+    def test_token_deleted_by_another_process(self):
+        Token.objects.filter(pk=self.token.pk).delete()
+        _shared_cache().delete(_cache_key(self.token.key))
+        self.assertEqual(self.client.get(self.path).status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get(self.path).status_code, 401)
+
+    def test_shared_cache_has_no_user_data(self):
+        value = _shared_cache().get(_cache_key(self.token.key))
+        self.assertIsInstance(value, str)
+
+
+class CursorPaginationTest(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipes = self.create_recipes(8)
+        for recipe in self.recipes[:5]:
+            Recipe.objects.filter(pk=recipe.pk).update(
+                favorites_count=recipe.pk % 2)
+
+    def collect(self, path):
+        """Метод обхода всех страниц списка по ссылкам next."""
+        ids = []
+        while path:
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            ids.extend(recipe["id"] for recipe in response.data["results"])
+            path = response.data["next"]
+        return ids
+
+    def test_default_order(self):
+        self.assertEqual(
+            self.collect("/api/recipes/?pagination=cursor"),
+            list(Recipe.objects.order_by(
+                "-pub_date", "-id").values_list("id", flat=True)))
+
+    def test_ordering_parameter_is_kept(self):
+        for ordering, expected in (
+                ("name", ("name",)),
+                ("-favorites_count", ("-favorites_count", "-id"))):
+            with self.subTest(ordering=ordering):
+                self.assertEqual(
+                    self.collect(f"/api/recipes/?pagination=cursor"
+                                 f"&ordering={ordering}"),
+                    list(Recipe.objects.order_by(*expected).values_list(
+                        "id", flat=True)))
+
+    def test_annotation_in_ordering(self):
+        queryset = Recipe.objects.annotate(
+            rank=ExpressionWrapper(
+                F("favorites_count") * 0.5, output_field=FloatField()),
+        ).order_by("-rank", "-pub_date")
+        ids, cursor = [], None
+        while True:
+            query = "?pagination=cursor" + (f"&cursor={cursor}" if cursor
+                                            else "")
+            paginator = RecipePagination()
+            page = paginator.paginate_queryset(
+                queryset, Request(APIRequestFactory().get("/" + query)))
+            ids.extend(recipe.pk for recipe in page)
+            if paginator.next_position is None:
+                break
+            cursor = paginator.encode_cursor(paginator.next_position)
+        self.assertEqual(ids, list(queryset.order_by(
+            "-rank", "-pub_date", "-id").values_list("id", flat=True)))
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/recipes/?cursor=invalid")
+        self.assertEqual(response.status_code, 404)
+
+
+class FeedEndpointTest(QueryCountTestCase):
+
+    def test_feed_uses_cursor_without_count(self):
+        for recipe in self.create_recipes(8):
+            FeedItem.objects.create(
+                user=self.user, recipe=recipe, author=self.author,
+                pub_date=recipe.pub_date)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/recipes/feed/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("count", response.data)
+        self.assertIn("cursor=", response.data["next"])
+        self.assertFalse(any(
+            "COUNT(" in query["sql"].upper()
+            and "recipes_feeditem" in query["sql"] for query in queries))
+        ids = [recipe["id"] for recipe in response.data["results"]]
+        next_page = self.client.get(response.data["next"])
+        ids += [recipe["id"] for recipe in next_page.data["results"]]
+        self.assertEqual(ids, list(FeedItem.objects.filter(
+            user=self.user).values_list("recipe_id", flat=True)))
+
+
+class RecipeCountersTest(QueryCountTestCase):
+
+    def test_favorite_and_unfavorite(self):
+        recipe = self.create_recipes(1)[0]
+        path = f"/api/recipes/{recipe.pk}/favorite/"
+        self.assertEqual(self.client.post(path).status_code, 201)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(self.client.delete(path).status_code, 204)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 0)
+
+    def test_recipe_delete(self):
+        recipe = Recipe.objects.create(
+            author=self.user, name="Суп", text="Описание рецепта",
+            cooking_time=10)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 1)
+        response = self.client.delete(f"/api/recipes/{recipe.pk}/")
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 0)
+
+
+class RecipeFilterTest(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        lunch = Tag.objects.create(name="Обед", color="#49B64E", slug="lunch")
+        dinner = Tag.objects.create(
+            name="Ужин", color="#8775D2", slug="dinner")
+        self.recipes = self.create_recipes(4)
+        for recipe, tags in zip(
+                self.recipes, ([self.tag, lunch], [lunch], [dinner], [])):
+            recipe.tags.set(tags)
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        ShoppingList.objects.create(user=self.user, recipe=self.recipes[1])
+
+    def filter(self, query):
+        response = self.client.get(f"/api/recipes/?{query}")
+        self.assertEqual(response.status_code, 200)
+        ids = [recipe["id"] for recipe in response.data["results"]]
+        self.assertEqual(response.data["count"], len(ids))
+        return set(ids)
+
+    def ids(self, *positions):
+        return {self.recipes[position].pk for position in positions}
+
+    def test_tags_are_combined_with_or_without_duplicates(self):
+        self.assertEqual(
+            self.filter("tags=breakfast&tags=lunch"), self.ids(0, 1))
+        self.assertEqual(self.filter("tags=dinner"), self.ids(2))
+
+    def test_user_lists(self):
+        for query, expected in (
+                ("is_favorited=1", self.ids(0)),
+                ("is_favorited=0", self.ids(1, 2, 3)),
+                ("is_in_shopping_cart=1", self.ids(1)),
+                ("is_in_shopping_cart=0", self.ids(0, 2, 3)),
+                ("is_favorited=1&is_in_shopping_cart=1", set())):
+            with self.subTest(query=query):
+                self.assertEqual(self.filter(query), expected)
+
+    def test_anonymous_user_lists(self):
+        self.client.force_authenticate(None)
+        for query, expected in (
+                ("is_favorited=1", set()),
+                ("is_favorited=0", self.ids(0, 1, 2, 3)),
+                ("is_in_shopping_cart=1", set()),
+                ("is_in_shopping_cart=0", self.ids(0, 1, 2, 3))):
+            with self.subTest(query=query):
+                self.assertEqual(self.filter(query), expected)
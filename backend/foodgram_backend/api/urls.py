@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CustomUserViewSet, IngredientViewSet,
-                    RecipeViewSet, TagViewSet)
+from .async_views import pooled_urlpatterns
+from .views import (CacheStatsView, CustomUserViewSet, IngredientViewSet,
+                    MetricsView, RecipeViewSet, TagViewSet)
 
 app_name = "api"
 
@@ -12,8 +14,14 @@ router.register("recipes", RecipeViewSet)
 router.register("ingredients", IngredientViewSet)
 router.register("tags", TagViewSet)
 
+router_urls = router.urls
+if settings.API_ASYNC_VIEWS:
+    router_urls = pooled_urlpatterns(router_urls)
+
 urlpatterns = [
-    path("", include(router.urls)),
+    path("cache/stats/", CacheStatsView.as_view(), name="cache-stats"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path("", include(router_urls)),
     path("", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
 ]
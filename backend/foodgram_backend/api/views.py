@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Subquery, Sum
 from django.db.models.functions import Lower
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from django_filters.rest_framework import DjangoFilterBackend
@@ -9,14 +11,29 @@ from rest_framework import exceptions, filters, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import (AllowAny, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from recipes.models import (Ingredient, Recipe, RecipeIngredients,
+from foodgram_backend.db.pool import get_pool_stats
+from recipes.indexes import ingredient_index, recipe_ingredient_index
+from recipes.models import (FeedItem, Ingredient, Recipe, RecipeIngredients,
                             ShoppingList, Subscription, Tag, Favorite)
+from recipes.search import search_recipes
+from .cache import (FAVORITES, INGREDIENTS, RECIPES, TAGS, cache_response,
+                    get_cache_stats, get_versions, is_cache_enabled)
+from .conditional import conditional_response
+from .facets import facets_requested, get_facets_version, get_tag_facets
+from .filters import RecipeFilter
+from .metrics import get_metrics, reset_metrics
+from .pagination import (FeedPagination, RecipePagination,
+                         SubscriptionPagination)
 from .permissions import IsAuthorOrAdminOrReadOnly
+from .resolvers import RecipeBatchResolver, SubscriptionRecipesResolver
 from .serializers import (ActionRecipeSerializer, IngredientSerializer,
                           RecipeCreateSerializer, RecipeInfoSerializer,
+                          RecipeMatchSerializer,
                           SubscriptionSerializer, TagSerializer,
                           UserSerializer)
 
@@ -40,14 +57,30 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
         ingredient_query = self.request.query_params.get("name")
 
         if ingredient_query:
-            for i in range(1, len(ingredient_query) + 1):
-                subset_query = ingredient_query[:i]
-                queryset = queryset.filter(name__istartswith=subset_query)
+            queryset = queryset.filter(name__istartswith=ingredient_query)
 
         queryset = queryset.annotate(lower_name=Lower("name"))
         queryset = queryset.order_by("lower_name")
         return queryset
 
+    @cache_response(INGREDIENTS)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @cache_response(INGREDIENTS)
+    def list(self, request, *args, **kwargs):
+        """Метод поиска ингредиентов по префиксному индексу в памяти."""
+        if "search" in request.query_params:
+            return super().list(request, *args, **kwargs)
+        limit = request.query_params.get("limit")
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                raise exceptions.ValidationError(
+                    "Параметр limit должен быть положительным числом.")
+            limit = int(limit)
+        return Response(ingredient_index.search(
+            request.query_params.get("name", ""), limit))
+
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тегов."""
@@ -56,15 +89,23 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (AllowAny,)
     pagination_class = None
 
+    @cache_response(TAGS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(TAGS)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Вьюсет для рецептов."""
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
-    pagination_class = PageNumberPagination
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
-    filterset_fields = ("author", "tags")
-    ordering_fields = ("name", "created_at", "updated_at")
+    filterset_class = RecipeFilter
+    ordering_fields = ("name", "created_at", "updated_at", "favorites_count")
 
     def get_serializer_class(self):
         """Метод динамического выбора сериализатора."""
@@ -74,26 +115,158 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Метод создания объекта."""
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            serializer.save(author=self.request.user)
 
     def get_queryset(self):
-        """Метод для получения queryset с примененными фильтрами."""
-        queryset = super().get_queryset()
-        is_favorited = self.request.query_params.get("is_favorited")
-        if is_favorited is not None:
-            queryset = queryset.filter(favorite_recipe__user=self.request.user)
-
-        is_in_shopping_cart = self.request.query_params.get(
-            "is_in_shopping_cart")
-        if is_in_shopping_cart is not None:
-            queryset = queryset.filter(shopping_list__user=self.request.user)
-
-        if is_favorited is not None and is_in_shopping_cart is not None:
-            queryset = queryset.filter(
-                favorite_recipe__user=self.request.user,
-                shopping_list__user=self.request.user)
+        """Метод для получения queryset с полнотекстовым поиском."""
+        queryset = super().get_queryset().select_related(
+            "author").prefetch_related("tags").defer("search_vector")
+        search = self.request.query_params.get("search")
+        if search:
+            queryset = search_recipes(queryset, search)
         return queryset
 
+    def get_user_state(self, user):
+        """Метод получения отпечатка избранного, покупок и подписок."""
+        if user.is_anonymous:
+            return ""
+        signatures = {}
+        for model, field in ((Favorite, "user"), (ShoppingList, "user"),
+                             (Subscription, "user")):
+            rows = model.objects.filter(
+                **{field: OuterRef("pk")}).order_by().values(field)
+            name = model._meta.model_name
+            signatures[f"{name}_count"] = Subquery(
+                rows.annotate(total=Count("id")).values("total"))
+            signatures[f"{name}_last"] = Subquery(
+                rows.annotate(last=Max("id")).values("last"))
+        state = User.objects.filter(pk=user.pk).annotate(
+            **signatures).values_list(*signatures).get()
+        return f"{user.pk}:{state}"
+
+    def get_recipe_version(self, request, *args, **kwargs):
+        """Метод получения id и даты изменения рецепта один раз за запрос."""
+        if not hasattr(self, "recipe_version"):
+            self.recipe_version = Recipe.objects.filter(
+                pk=kwargs.get("pk")).values_list("pk", "updated_at").first()
+        return self.recipe_version
+
+    def get_recipe_state(self, request, *args, **kwargs):
+        """Метод получения состояния рецепта для условного запроса."""
+        user = request.user
+        recipe = Recipe.objects.filter(pk=kwargs.get("pk"))
+        if user.is_anonymous:
+            state = self.get_recipe_version(request, *args, **kwargs)
+            return state and (f"{state[0]}:{state[1].isoformat()}", state[1])
+        state = recipe.annotate(
+            favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef("pk"))),
+            in_cart=Exists(ShoppingList.objects.filter(
+                user=user, recipe=OuterRef("pk"))),
+            subscribed=Exists(Subscription.objects.filter(
+                user=user, subscribing=OuterRef("author")))).values_list(
+            "pk", "updated_at", "favorited", "in_cart", "subscribed").first()
+        return state and (f"{user.pk}:{state}", None)
+
+    def get_list_state(self, request, *args, **kwargs):
+        """Метод получения состояния списка рецептов.
+
+        Для списка отдается только ETag из версий кэша рецептов, которые
+        меняются при любом изменении и удалении рецепта, и отпечатка
+        данных пользователя; при сортировке по favorites_count в него
+        входит и версия избранного. Версии хранятся в общем кэше, поэтому
+        без него условные запросы к списку не обрабатываются.
+        """
+        if not is_cache_enabled():
+            return None
+        namespaces = [RECIPES]
+        if "favorites_count" in request.query_params.get("ordering", ""):
+            namespaces.append(FAVORITES)
+        source = (f"{request.get_full_path()}:{get_versions(*namespaces)}:"
+                  f"{self.get_user_state(request.user)}")
+        if facets_requested(request):
+            source += f":{get_facets_version(request)}"
+        return source, None
+
+    @conditional_response("get_recipe_state")
+    @cache_response(RECIPES, anonymous_only=True,
+                    key_method="get_recipe_version")
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @conditional_response("get_list_state")
+    def list(self, request, *args, **kwargs):
+        """Метод получения списка рецептов с пакетной загрузкой данных.
+
+        С параметром facets=tags в ответ добавляются счетчики рецептов
+        по тегам для текущих фильтров.
+        """
+        base_queryset = self.get_queryset()
+        queryset = self.filter_queryset(base_queryset)
+        page = self.paginate_queryset(queryset)
+        recipes = page if page is not None else list(queryset)
+        context = self.get_serializer_context()
+        context["batch"] = RecipeBatchResolver(request.user, recipes)
+        context["image_variant"] = "card"
+        serializer = self.get_serializer(recipes, many=True, context=context)
+        if page is not None:
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(serializer.data)
+        if facets_requested(request):
+            facets = {"tags": get_tag_facets(request, base_queryset)}
+            if page is not None:
+                response.data["facets"] = facets
+            else:
+                response.data = {"results": response.data, "facets": facets}
+        return response
+
+    @action(detail=False, methods=("get",),
+            permission_classes=(IsAuthenticated,),
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        """Метод получения ленты рецептов авторов из подписок."""
+        items = FeedItem.objects.filter(user=request.user).select_related(
+            "recipe__author").prefetch_related("recipe__tags").defer(
+            "recipe__search_vector").order_by("-pub_date", "-recipe_id")
+        page = self.paginate_queryset(items)
+        recipes = [item.recipe for item in page]
+        context = self.get_serializer_context()
+        context["batch"] = RecipeBatchResolver(request.user, recipes)
+        context["image_variant"] = "card"
+        serializer = self.get_serializer(recipes, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=("get",), url_path="match",
+            pagination_class=PageNumberPagination)
+    def match_ingredients(self, request):
+        """Метод подбора рецептов по имеющимся ингредиентам."""
+        values = ",".join(request.query_params.getlist("ingredients"))
+        try:
+            ingredient_ids = {
+                int(value) for value in values.split(",") if value}
+        except ValueError:
+            raise exceptions.ValidationError(
+                "Идентификаторы ингредиентов должны быть числами.")
+        if not ingredient_ids:
+            raise exceptions.ValidationError(
+                "Передайте хотя бы один ингредиент.")
+
+        matches = self.paginate_queryset(
+            recipe_ingredient_index.match(ingredient_ids))
+        recipes = Recipe.objects.select_related("author").prefetch_related(
+            "tags").defer("search_vector").in_bulk(
+            [recipe_id for recipe_id, _ in matches])
+        recipes = [recipes[recipe_id] for recipe_id, _ in matches
+                   if recipe_id in recipes]
+        context = self.get_serializer_context()
+        context["batch"] = RecipeBatchResolver(request.user, recipes)
+        context["image_variant"] = "card"
+        context["coverage"] = dict(matches)
+        serializer = RecipeMatchSerializer(recipes, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=("post", "delete"))
     def favorite(self, request, pk=None):
         """Метод для создания/удаления рецепта из списка избранного."""
@@ -103,7 +276,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if self.request.method == "POST":
             if Favorite.objects.filter(user=user, recipe=recipe).exists():
                 raise exceptions.ValidationError("Рецепт уже в избранном.")
-            Favorite.objects.create(user=user, recipe=recipe)
+            with transaction.atomic():
+                Favorite.objects.create(user=user, recipe=recipe)
             serializer = ActionRecipeSerializer(
                 recipe, context={"request": request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -116,19 +290,27 @@ class RecipeViewSet(viewsets.ModelViewSet):
             permission_classes=(IsAuthenticated,))
     def download_shopping_cart(self, request):
         """Метод для скачивания списка покупок."""
-        shopping_cart = ShoppingList.objects.filter(user=self.request.user)
-        recipes = [item.recipe.id for item in shopping_cart]
         buy_list = RecipeIngredients.objects.filter(
-            recipe__in=recipes).values("ingredient").annotate(
-            amount=Sum("amount"))
-        buy_list_text = "Список покупок с сайта Foodgram:\n\n"
-        for item in buy_list:
-            ingredient = Ingredient.objects.get(pk=item["ingredient"])
-            amount = item["amount"]
-            buy_list_text += (
-                f"{ingredient.name}, {amount} "
-                f"{ingredient.measurement_unit}\n")
-        response = HttpResponse(buy_list_text, content_type="text/plain")
+            recipe__shopping_list__user=self.request.user).values(
+            "ingredient__name", "ingredient__measurement_unit").annotate(
+            amount=Sum("amount")).order_by("ingredient__name")
+
+        if settings.API_ASYNC_VIEWS:
+            # Под ASGI ответ читается в цикле событий без доступа к БД:
+            # строки выборки читаются здесь, в потоке пула, а текст
+            # по-прежнему формируется по мере отправки.
+            items = list(buy_list)
+        else:
+            items = buy_list.iterator()
+
+        def buy_list_lines():
+            yield "Список покупок с сайта Foodgram:\n\n"
+            for item in items:
+                yield (f"{item['ingredient__name']}, {item['amount']} "
+                       f"{item['ingredient__measurement_unit']}\n")
+
+        response = StreamingHttpResponse(
+            buy_list_lines(), content_type="text/plain")
         response["Content-Disposition"] = (
             "attachment; filename=shopping-list.txt")
         return response
@@ -143,7 +325,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             if ShoppingList.objects.filter(user=user, recipe=recipe).exists():
                 raise exceptions.ValidationError(
                     "Рецепт уже находится в списке покупок.")
-            ShoppingList.objects.create(user=user, recipe=recipe)
+            with transaction.atomic():
+                ShoppingList.objects.create(user=user, recipe=recipe)
             serializer = ActionRecipeSerializer(
                 recipe, context={"request": request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -159,17 +342,39 @@ class CustomUserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
+    def get_recipes_limit(self):
+        """Метод разбора параметра recipes_limit."""
+        limit = self.request.query_params.get("recipes_limit")
+        if not limit:
+            return None
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = -1
+        if limit < 0:
+            raise exceptions.ValidationError(
+                "recipes_limit должен быть неотрицательным целым числом.")
+        return limit
+
     @action(
         detail=False,
         methods=("get",),
         serializer_class=SubscriptionSerializer,
+        pagination_class=SubscriptionPagination,
         permission_classes=(IsAuthenticated, ))
     def subscriptions(self, request):
         """Метод получения подписки на пользователя."""
         pages = self.paginate_queryset(
-            Subscription.objects.filter(user=request.user))
-        serializer = SubscriptionSerializer(
-            pages, many=True, context={"request": request})
+            Subscription.objects.filter(
+                user=request.user).select_related(
+                "subscribing").order_by("id"))
+        context = {
+            "request": request,
+            "recipes_batch": SubscriptionRecipesResolver(
+                [subscription.subscribing_id for subscription in pages],
+                self.get_recipes_limit()),
+        }
+        serializer = SubscriptionSerializer(pages, many=True, context=context)
         return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=("post", "delete"),
@@ -181,6 +386,7 @@ class CustomUserViewSet(UserViewSet):
         subscribe = Subscription.objects.filter(
             user=request.user, subscribing=user)
         if request.method == "POST":
+            recipes_limit = self.get_recipes_limit()
             if user == request.user:
                 raise exceptions.ValidationError(
                     "Нельзя подписаться на самого себя.")
@@ -189,8 +395,8 @@ class CustomUserViewSet(UserViewSet):
                     user=request.user, subscribing=user)
                 if not created:
                     raise exceptions.ValidationError("Вы уже подписались.")
-                serializer = SubscriptionSerializer(
-                    obj, context={"request": request})
+                serializer = SubscriptionSerializer(obj, context={
+                    "request": request, "recipes_limit": recipes_limit})
                 return Response(
                     serializer.data, status=status.HTTP_201_CREATED)
             except Exception:
@@ -201,3 +407,26 @@ class CustomUserViewSet(UserViewSet):
                 "Подписка не оформлена или уже удалена.")
         subscribe.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CacheStatsView(APIView):
+    """Счетчики попаданий и промахов кэша ответов API."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_cache_stats())
+
+
+class MetricsView(APIView):
+    """Гистограммы по эндпоинтам и статистика пулов соединений процесса."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({
+            "endpoints": get_metrics(),
+            "db_pools": get_pool_stats(),
+        })
+
+    def delete(self, request):
+        reset_metrics()
+        return Response(status=status.HTTP_204_NO_CONTENT)
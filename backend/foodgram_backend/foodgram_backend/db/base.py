@@ -0,0 +1,54 @@
+import psycopg2.extras
+from django.db.backends.postgresql import base
+
+from .pool import ConnectionPool, get_pool
+
+
+def connect(conn_params):
+    """Открытие нового соединения так же, как это делает Django."""
+    connection = base.Database.connect(**conn_params)
+    psycopg2.extras.register_default_jsonb(
+        conn_or_curs=connection, loads=lambda x: x)
+    return connection
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Бэкенд PostgreSQL, берущий соединения из пула процесса.
+
+    Параметры пула задаются в ключе POOL настроек базы данных:
+    MAX_SIZE, TIMEOUT, MAX_LIFETIME и CHECK_AFTER. Закрытие соединения
+    Django возвращает его в пул, поэтому CONN_MAX_AGE должен быть 0.
+    """
+    _pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            conn_params = self.get_connection_params()
+            key = (self.alias, conn_params.get("database"),
+                   repr(sorted(conn_params.items())))
+            options = self.settings_dict.get("POOL", {})
+            self._pool = get_pool(key, lambda: ConnectionPool(
+                lambda: connect(conn_params),
+                max_size=options.get("MAX_SIZE", 10),
+                timeout=options.get("TIMEOUT", 10),
+                max_lifetime=options.get("MAX_LIFETIME", 1800),
+                check_after=options.get("CHECK_AFTER", 30)))
+        return self._pool
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.checkout()
+        options = self.settings_dict["OPTIONS"]
+        try:
+            self.isolation_level = options["isolation_level"]
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection)
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from collections import Counter
+
+import psycopg2
+from psycopg2 import extensions
+
+_pools_lock = threading.Lock()
+_pools = {}
+
+
+class ConnectionPool:
+    """Пул соединений PostgreSQL одного процесса.
+
+    Соединение проверяется при выдаче: закрытые, слишком старые и
+    не отвечающие на SELECT 1 соединения заменяются новыми. Если все
+    соединения заняты, поток ждет освобождения не дольше timeout секунд.
+    """
+
+    def __init__(self, connect, max_size, timeout=10, max_lifetime=1800,
+                 check_after=30):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self._condition = threading.Condition()
+        self._idle = []
+        self._created = {}
+        self._in_use = 0
+        self.stats = Counter()
+
+    def _discard(self, connection):
+        self._created.pop(connection, None)
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_healthy(self, connection, created_at, released_at):
+        now = time.monotonic()
+        if connection.closed or now - created_at > self.max_lifetime:
+            return False
+        if now - released_at < self.check_after:
+            return True
+        self.stats["health_checks"] += 1
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def checkout(self):
+        """Метод выдачи соединения из пула."""
+        if os.getpid() != self.pid:
+            # После fork соединения родителя использовать нельзя.
+            self._reset()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._condition:
+                waited = False
+                while not self._idle and (
+                        self._in_use + len(self._idle) >= self.max_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats["timeouts"] += 1
+                        raise psycopg2.OperationalError(
+                            "Нет свободных соединений в пуле за "
+                            f"{self.timeout} с.")
+                    if not waited:
+                        self.stats["waits"] += 1
+                        waited = True
+                    self._condition.wait(remaining)
+                entry = self._idle.pop() if self._idle else None
+                self._in_use += 1
+                self.stats["checkouts"] += 1
+
+            if entry is None:
+                try:
+                    connection = self.connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+                self._created[connection] = time.monotonic()
+                self.stats["created"] += 1
+                return connection
+
+            connection, released_at = entry
+            if self._is_healthy(
+                    connection, self._created.get(connection, 0), released_at):
+                return connection
+            self.stats["discarded"] += 1
+            self._discard(connection)
+            self._release_slot()
+
+    def _release_slot(self):
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+
+    def release(self, connection):
+        """Метод возврата соединения в пул."""
+        if os.getpid() != self.pid:
+            return
+        if not connection.closed and connection.info.transaction_status != (
+                extensions.TRANSACTION_STATUS_IDLE):
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                pass
+        reusable = (
+            not connection.closed
+            and connection.info.transaction_status == (
+                extensions.TRANSACTION_STATUS_IDLE))
+        if not reusable:
+            self.stats["discarded"] += 1
+            self._discard(connection)
+        with self._condition:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def close_idle(self):
+        """Метод закрытия всех свободных соединений."""
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                **self.stats,
+            }
+
+
+def get_pool(key, factory):
+    """Метод получения пула по ключу с созданием при первом обращении."""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = factory()
+        return pool
+
+
+def get_pool_stats():
+    """Метод получения статистики всех пулов процесса."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {f"{alias}/{name}": pool.get_stats()
+            for (alias, name, _), pool in pools.items()}
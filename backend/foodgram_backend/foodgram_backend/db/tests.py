@@ -0,0 +1,89 @@
+import threading
+
+import psycopg2
+from django.test import SimpleTestCase
+from psycopg2 import extensions
+
+from .pool import ConnectionPool
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    """Соединение-заглушка с интерфейсом, который использует пул."""
+
+    autocommit = True
+
+    def __init__(self):
+        self.closed = 0
+        self.info = FakeInfo()
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def execute(self, sql):
+                if connection.closed:
+                    raise psycopg2.OperationalError("closed")
+
+        return Cursor()
+
+    def rollback(self):
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def make_pool(self, **kwargs):
+        return ConnectionPool(FakeConnection, **{"max_size": 2, **kwargs})
+
+    def test_connection_is_reused(self):
+        pool = self.make_pool()
+        connection = pool.checkout()
+        pool.release(connection)
+        self.assertIs(pool.checkout(), connection)
+        self.assertEqual(pool.get_stats()["created"], 1)
+
+    def test_timeout_when_exhausted(self):
+        pool = self.make_pool(timeout=0.05)
+        pool.checkout()
+        pool.checkout()
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.checkout()
+        self.assertEqual(pool.get_stats()["timeouts"], 1)
+
+    def test_waiter_gets_released_connection(self):
+        pool = self.make_pool(max_size=1, timeout=1)
+        connection = pool.checkout()
+        threading.Timer(0.05, pool.release, (connection,)).start()
+        self.assertIs(pool.checkout(), connection)
+        self.assertEqual(pool.get_stats()["waits"], 1)
+
+    def test_broken_connection_is_replaced(self):
+        pool = self.make_pool(check_after=0)
+        connection = pool.checkout()
+        pool.release(connection)
+        connection.closed = 1
+        self.assertIsNot(pool.checkout(), connection)
+        self.assertEqual(pool.get_stats()["discarded"], 1)
+
+    def test_open_transaction_is_rolled_back(self):
+        pool = self.make_pool()
+        connection = pool.checkout()
+        connection.info.transaction_status = (
+            extensions.TRANSACTION_STATUS_INTRANS)
+        pool.release(connection)
+        self.assertEqual(connection.info.transaction_status,
+                         extensions.TRANSACTION_STATUS_IDLE)
+        self.assertEqual(pool.get_stats()["idle"], 1)
@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -21,6 +22,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "django_filters",
 
     "rest_framework",
@@ -33,6 +35,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -66,17 +69,70 @@ WSGI_APPLICATION = "foodgram_backend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Размер пула соединений на процесс; 0 отключает пул, тогда соединения
+# переиспользуются в пределах DB_CONN_MAX_AGE секунд.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 0))
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", 30000))
+# Ограничение времени запроса нужно веб-процессам. Команды manage.py
+# (migrate, load_csv, import_recipes, rebuild_feeds, обработчики очередей)
+# работают с большими объемами и по умолчанию выполняются без него.
+MANAGEMENT_COMMAND = (
+    sys.argv[1] if len(sys.argv) > 1
+    and os.path.basename(sys.argv[0]) == "manage.py" else None)
+if MANAGEMENT_COMMAND not in (None, "runserver"):
+    DB_STATEMENT_TIMEOUT = int(
+        os.getenv("DB_COMMAND_STATEMENT_TIMEOUT", 0))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": ("foodgram_backend.db" if DB_POOL_SIZE
+                   else "django.db.backends.postgresql"),
         "NAME": os.getenv("POSTGRES_DB", "django"),
         "USER": os.getenv("POSTGRES_USER", "django"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
         "HOST": os.getenv("DB_HOST", ""),
-        "PORT": os.getenv("DB_PORT", 5432)
+        "PORT": os.getenv("DB_PORT", 5432),
+        "CONN_MAX_AGE": (0 if DB_POOL_SIZE
+                         else int(os.getenv("DB_CONN_MAX_AGE", 60))),
+        "OPTIONS": {
+            "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT}",
+        },
+        "POOL": {
+            "MAX_SIZE": DB_POOL_SIZE,
+            "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+            "MAX_LIFETIME": int(os.getenv("DB_POOL_MAX_LIFETIME", 1800)),
+            "CHECK_AFTER": int(os.getenv("DB_POOL_CHECK_AFTER", 30)),
+        },
     }
 }
 
+# Режим сервера приложений: wsgi (gunicorn sync) или asgi (uvicorn).
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+API_ASYNC_VIEWS = SERVER_MODE == "asgi"
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+API_CACHE_ALIAS = "api"
+API_CACHE_BACKEND = os.getenv(
+    "API_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache")
+# Кэш в памяти процесса не виден другим процессам gunicorn и фоновым
+# обработчикам, поэтому ответы API кэшируются только в общем кэше.
+API_CACHE_ENABLED = os.getenv(
+    "API_CACHE_ENABLED", str("locmem" not in API_CACHE_BACKEND)) == "True"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    API_CACHE_ALIAS: {
+        "BACKEND": API_CACHE_BACKEND,
+        "LOCATION": os.getenv("API_CACHE_LOCATION", "api"),
+        "TIMEOUT": int(os.getenv("API_CACHE_TIMEOUT", 300)),
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -120,6 +176,48 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+MAX_IMAGE_UPLOAD_SIZE = int(
+    os.getenv("MAX_IMAGE_UPLOAD_SIZE", 10 * 1024 * 1024))
+
+IMAGE_PROCESSING_ASYNC = os.getenv("IMAGE_PROCESSING_ASYNC", "True") == "True"
+IMAGE_WORKER_CONCURRENCY = int(os.getenv("IMAGE_WORKER_CONCURRENCY", 2))
+IMAGE_WORKER_MAX_ATTEMPTS = int(os.getenv("IMAGE_WORKER_MAX_ATTEMPTS", 3))
+
+FEED_MAX_LENGTH = int(os.getenv("FEED_MAX_LENGTH", 500))
+FEED_FANOUT_ASYNC = os.getenv("FEED_FANOUT_ASYNC", "True") == "True"
+FEED_WORKER_MAX_ATTEMPTS = int(os.getenv("FEED_WORKER_MAX_ATTEMPTS", 3))
+
+# Без общего кэша отозванный токен принимается другими процессами до
+# истечения TOKEN_CACHE_TTL, поэтому время жизни записи короче.
+TOKEN_CACHE_ALIAS = os.getenv(
+    "TOKEN_CACHE_ALIAS", API_CACHE_ALIAS if API_CACHE_ENABLED else "")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
+TOKEN_CACHE_TTL = int(os.getenv(
+    "TOKEN_CACHE_TTL", 60 if TOKEN_CACHE_ALIAS else 5))
+TOKEN_SHARED_CACHE_TTL = int(os.getenv("TOKEN_SHARED_CACHE_TTL", 300))
+
+REQUEST_METRICS_ENABLED = os.getenv(
+    "REQUEST_METRICS_ENABLED", "True") == "True"
+
+# Допустимое количество запросов к БД на эндпоинт, "МЕТОД имя-маршрута".
+QUERY_BUDGETS = {
+    "GET api:recipe-list": 11,
+    "GET api:recipe-detail": 7,
+    "GET api:recipe-match-ingredients": 7,
+    "GET api:recipe-feed": 7,
+    "GET api:recipe-download-shopping-cart": 2,
+    "POST api:recipe-favorite": 5,
+    "POST api:recipe-shopping-cart": 5,
+    "GET api:user-list": 8,
+    "GET api:user-detail": 2,
+    "GET api:user-me": 1,
+    "GET api:user-subscriptions": 3,
+    "GET api:tag-list": 1,
+    "GET api:tag-detail": 1,
+    "GET api:ingredient-list": 1,
+    "GET api:ingredient-detail": 1,
+}
+
 AUTH_USER_MODEL = "users.User"
 
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
@@ -136,7 +234,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 6,
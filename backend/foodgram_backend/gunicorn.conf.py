@@ -0,0 +1,10 @@
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:7000")
+workers = int(os.getenv("GUNICORN_WORKERS", 1))
+
+if os.getenv("SERVER_MODE", "wsgi") == "asgi":
+    wsgi_app = "foodgram_backend.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "foodgram_backend.wsgi:application"
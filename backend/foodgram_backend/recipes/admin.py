@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 
-from .models import Ingredient, Recipe, RecipeIngredients, Subscription, Tag
+from .models import (FeedJob, ImageJob, Ingredient, Recipe,
+                     RecipeIngredients, Subscription, Tag)
+from .search import update_search_vector
 
 
 @admin.register(Ingredient)
@@ -26,12 +28,16 @@ class TagAdmin(ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "author", "pub_date")
+    list_display = ("id", "name", "author", "pub_date", "favorites_count")
     search_fields = ("text", "name")
     list_filter = ("pub_date", "name", "author", "tags")
     inlines = (IngredientInline,)
     empty_value_display = "-пусто-"
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        update_search_vector(Recipe.objects.filter(pk=form.instance.pk))
+
 
 @admin.register(RecipeIngredients)
 class RecipeIngredientsAdmin(admin.ModelAdmin):
@@ -39,9 +45,32 @@ class RecipeIngredientsAdmin(admin.ModelAdmin):
     search_fields = ("ingredient__name",)
     empty_value_display = "-пусто-"
 
+    def touch_recipe(self, obj):
+        """Обновление даты изменения и поиска рецепта после правки состава.
+
+        Сохранение рецепта также сбрасывает кэш его ответов API.
+        """
+        obj.recipe.save(update_fields=("updated_at",))
+        update_search_vector(Recipe.objects.filter(pk=obj.recipe_id))
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.touch_recipe(obj)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.touch_recipe(obj)
+
 
 @admin.register(Subscription)
 class SubscriptionAdmin(ModelAdmin):
     list_display = ("id", "user", "subscribing")
     search_fields = ("user__email", "subscribing__email")
     empty_value_display = "-пусто-"
+
+
+@admin.register(ImageJob, FeedJob)
+class JobAdmin(ModelAdmin):
+    list_display = ("id", "recipe", "status", "attempts", "run_after")
+    list_filter = ("status",)
+    empty_value_display = "-пусто-"
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorite, Recipe, ShoppingList
+
+User = get_user_model()
+
+
+def _count_subquery(model, field):
+    """Подзапрос количества связанных строк для массового обновления."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef("pk")}).order_by().values(
+            field).annotate(total=Count("id")).values("total")), 0)
+
+
+def change_counter(model, pk, field, delta):
+    """Метод атомарного изменения счетчика на delta."""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+@transaction.atomic
+def recount_counters():
+    """Метод пересчета всех денормализованных счетчиков."""
+    users = User.objects.update(
+        recipes_count=_count_subquery(Recipe, "author"))
+    recipes = Recipe.objects.update(
+        favorites_count=_count_subquery(Favorite, "recipe"),
+        shopping_cart_count=_count_subquery(ShoppingList, "recipe"))
+    return users, recipes
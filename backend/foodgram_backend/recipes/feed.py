@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+from .models import FeedItem, Recipe, Subscription
+
+TRIM_BATCH_SIZE = 500
+
+TRIM_FEEDS = """
+DELETE FROM {table} WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY user_id ORDER BY pub_date DESC, recipe_id DESC
+        ) AS position
+        FROM {table}
+        WHERE user_id IN ({users})
+    ) AS ranked
+    WHERE position > %s)
+"""
+
+
+def get_feed_length():
+    return getattr(settings, "FEED_MAX_LENGTH", 500)
+
+
+def trim_feeds(user_ids):
+    """Метод удаления из лент записей сверх FEED_MAX_LENGTH.
+
+    Оконный DELETE выполняется только для лент, длина которых
+    превышает предел; остальные ленты не сканируются повторно.
+    """
+    user_ids = list(user_ids)
+    length = get_feed_length()
+    for start in range(0, len(user_ids), TRIM_BATCH_SIZE):
+        batch = list(FeedItem.objects.filter(
+            user_id__in=user_ids[start:start + TRIM_BATCH_SIZE]).values(
+            "user_id").annotate(total=Count("id")).order_by().filter(
+            total__gt=length).values_list("user_id", flat=True))
+        if not batch:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(TRIM_FEEDS.format(
+                table=FeedItem._meta.db_table,
+                users=", ".join(["%s"] * len(batch))),
+                [*batch, length])
+
+
+def fan_out_recipe(recipe):
+    """Метод добавления нового рецепта в ленты подписчиков автора."""
+    followers = list(Subscription.objects.filter(
+        subscribing_id=recipe.author_id).values_list("user_id", flat=True))
+    FeedItem.objects.bulk_create(
+        (FeedItem(user_id=user_id, recipe_id=recipe.pk,
+                  author_id=recipe.author_id, pub_date=recipe.pub_date)
+         for user_id in followers),
+        batch_size=1000, ignore_conflicts=True)
+    trim_feeds(followers)
+
+
+def add_author_to_feed(user_id, author_id):
+    """Метод добавления последних рецептов автора в ленту подписчика."""
+    recipes = Recipe.objects.filter(author_id=author_id).order_by(
+        "-pub_date", "-id").values_list("id", "pub_date")[:get_feed_length()]
+    FeedItem.objects.bulk_create(
+        (FeedItem(user_id=user_id, recipe_id=recipe_id,
+                  author_id=author_id, pub_date=pub_date)
+         for recipe_id, pub_date in recipes),
+        ignore_conflicts=True)
+    trim_feeds([user_id])
+
+
+def remove_author_from_feed(user_id, author_id):
+    """Метод удаления рецептов автора из ленты бывшего подписчика."""
+    FeedItem.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild_feed(user_id, clear=True):
+    """Метод заполнения ленты пользователя по его текущим подпискам.
+
+    С clear=False существующие записи не удаляются и добавляются
+    только недостающие.
+    """
+    if clear:
+        FeedItem.objects.filter(user_id=user_id).delete()
+    recipes = Recipe.objects.filter(
+        author__subscribing__user_id=user_id).order_by(
+        "-pub_date", "-id").values_list(
+        "id", "author_id", "pub_date")[:get_feed_length()]
+    FeedItem.objects.bulk_create(
+        (FeedItem(user_id=user_id, recipe_id=recipe_id,
+                  author_id=author_id, pub_date=pub_date)
+         for recipe_id, author_id, pub_date in recipes),
+        ignore_conflicts=True)
+    if not clear:
+        trim_feeds([user_id])
@@ -1,19 +1,122 @@
 import base64
+import binascii
+from tempfile import SpooledTemporaryFile
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files import File
+from PIL import Image
 from rest_framework import serializers
 
+from .images import get_image_name
+
+BASE64_MARKER = ";base64,"
+CHUNK_SIZE = 64 * 1024
+SPOOL_SIZE = 1024 * 1024
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+
+def sniff_image_format(header):
+    """Метод определения формата изображения по сигнатуре файла."""
+    for signature, ext in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return ext
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def decode_base64_image(data, start, max_size):
+    """Метод потокового декодирования base64 во временный файл.
+
+    Пробелы и переводы строк пропускаются, как при обычном b64decode.
+    Размер результата проверяется по мере декодирования, формат
+    определяется по первым байтам, а данные пишутся частями
+    в SpooledTemporaryFile без создания полной копии в памяти.
+    """
+    image_file = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    ext = None
+    size = 0
+    carry = ""
+    try:
+        for position in range(start, len(data), CHUNK_SIZE):
+            chunk = carry + "".join(
+                data[position:position + CHUNK_SIZE].split())
+            usable = len(chunk) - len(chunk) % 4
+            carry = chunk[usable:]
+            if not usable:
+                continue
+            decoded = base64.b64decode(chunk[:usable], validate=True)
+            size += len(decoded)
+            if size > max_size:
+                raise serializers.ValidationError(
+                    f"Размер изображения не должен превышать {max_size} "
+                    "байт.")
+            if ext is None:
+                ext = sniff_image_format(decoded)
+                if ext is None:
+                    raise serializers.ValidationError(
+                        "Неподдерживаемый формат изображения.")
+            image_file.write(decoded)
+    except (ValueError, binascii.Error):
+        image_file.close()
+        raise serializers.ValidationError("Неверный код изображения")
+    except serializers.ValidationError:
+        image_file.close()
+        raise
+    if ext is None or carry:
+        image_file.close()
+        raise serializers.ValidationError("Неверный код изображения")
+    image_file.seek(0)
+    return File(image_file, name=f"image.{ext}")
+
 
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
-            try:
-                format, imgstr = data.split(";base64,")
-                ext = format.split("/")[-1]
-                data = base64.b64decode(imgstr)
-                file_name = f"image.{ext}"
-                data = ContentFile(data, name=file_name)
-                return super().to_internal_value(data)
-            except (ValueError, base64.binascii.Error):
+            start = data.find(BASE64_MARKER, 0, 100)
+            if start == -1:
                 raise serializers.ValidationError("Неверный код изображения")
+            image = decode_base64_image(
+                data, start + len(BASE64_MARKER),
+                settings.MAX_IMAGE_UPLOAD_SIZE)
+            image = serializers.FileField.to_internal_value(self, image)
+            try:
+                Image.open(image).verify()
+            except Exception:
+                image.close()
+                raise serializers.ValidationError(
+                    self.error_messages["invalid_image"])
+            image.seek(0)
+            return image
         return super().to_internal_value(data)
+
+
+class RecipeImageField(serializers.Field):
+    """Поле ссылки на изображение рецепта в нужном варианте размера.
+
+    Вариант берется из контекста сериализатора ("image_variant"),
+    иначе используется variant поля; без вариантов отдается оригинал.
+    """
+
+    def __init__(self, variant=None, **kwargs):
+        self.variant = variant
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        request = self.context.get("request")
+        query_params = getattr(request, "query_params", {})
+        name = get_image_name(
+            recipe,
+            self.context.get("image_variant", self.variant),
+            query_params.get("image_format", "webp"))
+        if not name:
+            return None
+        url = recipe.image.storage.url(name)
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,146 @@
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+VARIANT_SIZES = {
+    "thumb": (160, 160),
+    "card": (480, 360),
+}
+ORIGINAL_SAVE_OPTIONS = {
+    "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 85},
+}
+VARIANT_SAVE_OPTIONS = {
+    "webp": {"quality": 80, "method": 6},
+    "avif": {"quality": 60},
+}
+
+
+def get_variant_formats():
+    """Метод получения форматов вариантов, поддерживаемых Pillow."""
+    Image.init()
+    return [fmt for fmt in VARIANT_SAVE_OPTIONS if fmt.upper() in Image.SAVE]
+
+
+def _save_once(storage, name, image, fmt, options, created):
+    """Метод сохранения файла, если файла с таким именем еще нет.
+
+    Имена новых файлов добавляются в список created.
+    """
+    if storage.exists(name):
+        return name
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    name = storage.save(name, ContentFile(buffer.getvalue()))
+    created.append(name)
+    return name
+
+
+def _prepare(image):
+    """Метод поворота по EXIF и приведения к RGB/RGBA без метаданных."""
+    image = ImageOps.exif_transpose(image)
+    mode = "RGBA" if "A" in image.getbands() else "RGB"
+    if image.mode == "P" and "transparency" in image.info:
+        mode = "RGBA"
+    return image.convert(mode)
+
+
+def save_if_image_unchanged(recipe, image_name, **fields):
+    """Метод сохранения полей рецепта, если его файл не заменили.
+
+    Запись выполняется условным UPDATE по текущему имени файла, поэтому
+    загруженное за время обработки изображение не перезаписывается.
+    Сигнал post_save отправляется вручную для сброса кэшей. Возвращает
+    True, если рецепт обновлен.
+    """
+    fields["updated_at"] = timezone.now()
+    updated = type(recipe).objects.filter(
+        pk=recipe.pk, image=image_name).update(**fields)
+    if not updated:
+        return False
+    for field, value in fields.items():
+        setattr(recipe, field, value)
+    post_save.send(
+        sender=type(recipe), instance=recipe, created=False,
+        update_fields=frozenset(fields), raw=False, using=recipe._state.db)
+    return True
+
+
+def process_recipe_image(recipe):
+    """Метод обработки изображения рецепта.
+
+    Пересжимает оригинал без метаданных и создает уменьшенные варианты
+    в форматах WebP/AVIF. Имена файлов строятся по хэшу содержимого,
+    поэтому одинаковые изображения хранятся один раз.
+    """
+    if not recipe.image:
+        if recipe.image_variants:
+            recipe.image_variants = {}
+            recipe.save(update_fields=("image_variants", "updated_at"))
+        return
+
+    storage = recipe.image.storage
+    old_name = recipe.image.name
+    if recipe.image_variants.get("source") == old_name:
+        return
+    with recipe.image.open("rb") as image_file:
+        content = image_file.read()
+    digest = hashlib.sha256(content).hexdigest()[:32]
+
+    source = Image.open(BytesIO(content))
+    source_format = source.format if source.format in (
+        ORIGINAL_SAVE_OPTIONS) else "PNG"
+    image = _prepare(source)
+    if source_format == "JPEG":
+        image = image.convert("RGB")
+    ext = "jpg" if source_format == "JPEG" else source_format.lower()
+
+    variants = {"hash": digest}
+    created = []
+    original_name = _save_once(
+        storage, f"recipes/{digest}.{ext}", image, source_format,
+        ORIGINAL_SAVE_OPTIONS[source_format], created)
+    for variant, size in VARIANT_SIZES.items():
+        resized = ImageOps.fit(image, size, Image.LANCZOS)
+        variants[variant] = {
+            fmt: _save_once(
+                storage, f"recipes/variants/{digest}_{variant}.{fmt}",
+                resized, fmt.upper(), VARIANT_SAVE_OPTIONS[fmt], created)
+            for fmt in get_variant_formats()}
+    variants["source"] = original_name
+
+    if not save_if_image_unchanged(
+            recipe, old_name, image=original_name, image_variants=variants):
+        for name in created:
+            storage.delete(name)
+        return
+
+    still_used = type(recipe).objects.filter(image=old_name).exists()
+    if old_name != original_name and not still_used:
+        storage.delete(old_name)
+
+
+def get_image_status(recipe):
+    """Метод получения состояния обработки изображения рецепта."""
+    if not recipe.image:
+        return None
+    if recipe.image_variants.get("source") == recipe.image.name:
+        return "ready"
+    if recipe.image_variants.get("failed_source") == recipe.image.name:
+        return "failed"
+    return "pending"
+
+
+def get_image_name(recipe, variant=None, fmt="webp"):
+    """Метод выбора файла изображения рецепта для нужного варианта."""
+    if not recipe.image:
+        return None
+    formats = recipe.image_variants.get(variant) if variant else None
+    if formats:
+        return formats.get(fmt) or formats.get("webp") or recipe.image.name
+    return recipe.image.name
@@ -0,0 +1,270 @@
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+from .models import Ingredient, RecipeIngredients
+
+
+def _sort_key(name):
+    """Ключ сортировки, близкий к Lower("name") в русской локали."""
+    lowered = name.lower()
+    return lowered.replace("ё", "е"), lowered
+
+
+class IngredientPrefixIndex:
+    """Регистронезависимый префиксный индекс ингредиентов в памяти.
+
+    Индекс строится один раз на процесс при первом обращении
+    и перестраивается после изменения модели Ingredient, а также
+    не реже, чем раз в INGREDIENT_INDEX_TTL секунд, чтобы подхватить
+    массовую загрузку и изменения из других процессов.
+
+    Как и в RecipeIngredientIndex, в запросе выполняется только первое
+    построение: устаревший индекс перестраивается в фоновом потоке,
+    а до замены запросы обслуживает прежний снимок.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._snapshot = None
+        self._built_at = 0
+        self._generation = 0
+        self._built_generation = 0
+        self._rebuilding = False
+
+    def invalidate(self):
+        """Метод пометки индекса устаревшим, перестроение - при поиске."""
+        with self._lock:
+            self._generation += 1
+
+    def _load(self):
+        ingredients = sorted(
+            Ingredient.objects.values_list(
+                "id", "name", "measurement_unit").iterator(),
+            key=lambda row: (_sort_key(row[1]), row[0]))
+        rows = [
+            {"id": pk, "name": name, "measurement_unit": unit}
+            for pk, name, unit in ingredients]
+        prefix_sorted = sorted(
+            range(len(rows)),
+            key=lambda position: (rows[position]["name"].lower(), position))
+        keys = [rows[position]["name"].lower()
+                for position in prefix_sorted]
+        return keys, rows, prefix_sorted
+
+    def _build(self, force=True):
+        """Метод построения снимка индекса и атомарной замены прежнего.
+
+        Сброс, пришедший во время чтения из БД, оставляет новый снимок
+        устаревшим, и следующий поиск запустит перестройку снова.
+        """
+        with self._build_lock:
+            if not force and self._snapshot is not None:
+                return
+            with self._lock:
+                generation = self._generation
+            snapshot = self._load()
+            with self._lock:
+                self._snapshot = snapshot
+                self._built_generation = generation
+                self._built_at = time.monotonic()
+
+    def _rebuild_in_background(self):
+        try:
+            self._build()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+            connections.close_all()
+
+    def _ensure_built(self):
+        ttl = getattr(settings, "INGREDIENT_INDEX_TTL", 600)
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None:
+                stale = (self._built_generation != self._generation
+                         or time.monotonic() - self._built_at > ttl)
+                if stale and not self._rebuilding:
+                    self._rebuilding = True
+                    self._built_at = time.monotonic()
+                    threading.Thread(
+                        target=self._rebuild_in_background,
+                        daemon=True).start()
+                return snapshot
+        self._build(force=False)
+        with self._lock:
+            return self._snapshot
+
+    def search(self, prefix="", limit=None):
+        """Метод поиска ингредиентов по началу названия."""
+        keys, rows, order = self._ensure_built()
+        if not prefix:
+            return rows[:limit]
+        prefix = prefix.lower()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + "\U0010ffff", lo=start)
+        positions = sorted(order[start:end])
+        return [rows[position] for position in positions[:limit]]
+
+
+class RecipeIngredientIndex:
+    """Инвертированный индекс "ингредиент -> рецепты" в памяти.
+
+    Для каждого ингредиента хранится отсортированный массив
+    идентификаторов рецептов. Изменения RecipeIngredients применяются
+    инкрементально в текущем процессе, а полная перестройка выполняется
+    не реже, чем раз в RECIPE_INGREDIENT_INDEX_TTL секунд, чтобы
+    подхватить изменения из других процессов.
+
+    Только первое построение выполняется в запросе. Устаревший индекс
+    перестраивается в фоновом потоке без блокировки: до замены запросы
+    обслуживает прежний индекс, а изменения, пришедшие во время чтения
+    из БД, повторяются на новом индексе перед заменой.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._postings = None
+        self._recipes = None
+        self._built_at = 0
+        self._pending = None
+
+    def invalidate(self):
+        """Метод сброса индекса, перестроение произойдет при поиске."""
+        with self._lock:
+            self._postings = None
+            self._recipes = None
+
+    def _load(self):
+        postings = {}
+        recipes = {}
+        rows = RecipeIngredients.objects.order_by(
+            "ingredient_id", "recipe_id").values_list(
+            "ingredient_id", "recipe_id").iterator()
+        for ingredient_id, recipe_id in rows:
+            if ingredient_id not in postings:
+                postings[ingredient_id] = array("q")
+            postings[ingredient_id].append(recipe_id)
+            recipes.setdefault(recipe_id, set()).add(ingredient_id)
+        return postings, recipes
+
+    def _build(self, force=True):
+        """Метод построения индекса и атомарной замены прежнего."""
+        with self._build_lock:
+            if not force and self._postings is not None:
+                return
+            with self._lock:
+                self._pending = []
+            try:
+                postings, recipes = self._load()
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                pending, self._pending = self._pending, None
+                self._postings, self._recipes = postings, recipes
+                for method, args in pending:
+                    method(*args)
+                self._built_at = time.monotonic()
+
+    def _rebuild_in_background(self):
+        try:
+            self._build()
+        finally:
+            connections.close_all()
+
+    def _ensure_built(self):
+        ttl = getattr(settings, "RECIPE_INGREDIENT_INDEX_TTL", 600)
+        with self._lock:
+            if self._postings is not None:
+                if (time.monotonic() - self._built_at > ttl
+                        and not self._build_lock.locked()):
+                    # Повторный запуск до завершения перестройки
+                    # не нужен: сдвигаем срок сразу.
+                    self._built_at = time.monotonic()
+                    threading.Thread(
+                        target=self._rebuild_in_background,
+                        daemon=True).start()
+                return
+        self._build(force=False)
+
+    def _apply(self, method, *args):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((method, args))
+            if self._postings is not None:
+                method(*args)
+
+    def _add(self, recipe_id, ingredient_id):
+        ingredients = self._recipes.setdefault(recipe_id, set())
+        if ingredient_id in ingredients:
+            return
+        ingredients.add(ingredient_id)
+        insort(self._postings.setdefault(ingredient_id, array("q")),
+               recipe_id)
+
+    def _discard(self, recipe_id, ingredient_id):
+        ingredients = self._recipes.get(recipe_id)
+        if not ingredients or ingredient_id not in ingredients:
+            return
+        ingredients.discard(ingredient_id)
+        if not ingredients:
+            del self._recipes[recipe_id]
+        posting = self._postings[ingredient_id]
+        del posting[bisect_left(posting, recipe_id)]
+
+    def _set_recipe(self, recipe_id, ingredient_ids):
+        current = self._recipes.get(recipe_id, set())
+        for ingredient_id in current - ingredient_ids:
+            self._discard(recipe_id, ingredient_id)
+        for ingredient_id in ingredient_ids - current:
+            self._add(recipe_id, ingredient_id)
+
+    def add(self, recipe_id, ingredient_id):
+        """Метод добавления ингредиента в рецепт."""
+        self._apply(self._add, recipe_id, ingredient_id)
+
+    def discard(self, recipe_id, ingredient_id):
+        """Метод удаления ингредиента из рецепта."""
+        self._apply(self._discard, recipe_id, ingredient_id)
+
+    def set_recipe(self, recipe_id, ingredient_ids):
+        """Метод замены полного списка ингредиентов рецепта."""
+        self._apply(self._set_recipe, recipe_id, set(ingredient_ids))
+
+    def remove_recipe(self, recipe_id):
+        """Метод удаления рецепта из индекса."""
+        self.set_recipe(recipe_id, ())
+
+    def match(self, ingredient_ids, limit=None):
+        """Метод подбора рецептов по набору ингредиентов.
+
+        Возвращает список пар (id рецепта, доля имеющихся ингредиентов),
+        упорядоченный по убыванию доли, числа совпадений и id рецепта.
+        """
+        self._ensure_built()
+        with self._lock:
+            hits = Counter()
+            for ingredient_id in set(ingredient_ids):
+                hits.update(self._postings.get(ingredient_id, ()))
+            ranked = (
+                (count / len(self._recipes[recipe_id]), count, recipe_id)
+                for recipe_id, count in hits.items())
+            if limit is None:
+                ranked = sorted(ranked, reverse=True)
+            else:
+                ranked = heapq.nlargest(limit, ranked)
+        return [(recipe_id, coverage) for coverage, _, recipe_id in ranked]
+
+
+ingredient_index = IngredientPrefixIndex()
+recipe_ingredient_index = RecipeIngredientIndex()
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+import django
+from django.db import connections, transaction
+from django.utils import timezone
+
+# Модели импортируются внутри функций: модуль загружается дочерними
+# процессами пула до вызова django.setup().
+
+RETRY_DELAY = 30
+
+
+def enqueue_image_job(recipe):
+    """Метод постановки изображения рецепта в очередь обработки."""
+    from .models import ImageJob
+
+    def create_job():
+        if not ImageJob.objects.filter(
+                recipe_id=recipe.pk, status=ImageJob.PENDING).exists():
+            ImageJob.objects.create(recipe_id=recipe.pk)
+
+    transaction.on_commit(create_job)
+
+
+def enqueue_feed_job(recipe):
+    """Метод постановки рецепта в очередь рассылки по лентам."""
+    from .models import FeedJob
+
+    transaction.on_commit(lambda: FeedJob.objects.create(recipe_id=recipe.pk))
+
+
+def claim_jobs(model, limit):
+    """Метод захвата готовых к запуску задач для текущего процесса.
+
+    На PostgreSQL строки блокируются с SKIP LOCKED, поэтому несколько
+    процессов-обработчиков не получают одну и ту же задачу.
+    """
+    with transaction.atomic():
+        jobs = list(model.objects.select_for_update(
+            skip_locked=True).filter(
+            status=model.PENDING,
+            run_after__lte=timezone.now()).values_list(
+            "id", flat=True)[:limit])
+        model.objects.filter(id__in=jobs).update(
+            status=model.PROCESSING, started_at=timezone.now())
+    return jobs
+
+
+def requeue_stale_jobs(model, stale_after):
+    """Метод возврата в очередь задач, зависших в обработке."""
+    return model.objects.filter(
+        status=model.PROCESSING,
+        started_at__lt=timezone.now() - timedelta(seconds=stale_after),
+    ).update(status=model.PENDING)
+
+
+def retry_or_fail(model, job, attempts, max_attempts, error):
+    """Метод возврата задачи в очередь с экспоненциальной задержкой.
+
+    Возвращает итоговый статус: PENDING, пока не исчерпаны попытки,
+    иначе FAILED.
+    """
+    if attempts < max_attempts:
+        status = model.PENDING
+        run_after = timezone.now() + timedelta(
+            seconds=RETRY_DELAY * 2 ** (attempts - 1))
+    else:
+        status = model.FAILED
+        run_after = job.run_after
+    model.objects.filter(pk=job.pk).update(
+        status=status, run_after=run_after, last_error=repr(error))
+    return status
+
+
+def init_worker():
+    """Инициализация дочернего процесса пула обработчиков."""
+    django.setup()
+    connections.close_all()
+
+
+def run_image_job(job_id, max_attempts):
+    """Метод выполнения одной задачи в дочернем процессе.
+
+    Возвращает итоговый статус задачи. При ошибке задача возвращается
+    в очередь с экспоненциальной задержкой, пока не исчерпаны попытки.
+    """
+    from django.db.models import F
+
+    from .images import process_recipe_image, save_if_image_unchanged
+    from .models import ImageJob
+
+    job = ImageJob.objects.select_related("recipe").get(pk=job_id)
+    ImageJob.objects.filter(pk=job_id).update(attempts=F("attempts") + 1)
+    attempts = job.attempts + 1
+    try:
+        process_recipe_image(job.recipe)
+    except Exception as error:
+        status = retry_or_fail(ImageJob, job, attempts, max_attempts, error)
+        if status == ImageJob.FAILED:
+            recipe = job.recipe
+            save_if_image_unchanged(
+                recipe, recipe.image.name, image_variants={
+                    **recipe.image_variants,
+                    "failed_source": recipe.image.name})
+        return status
+    ImageJob.objects.filter(pk=job_id).update(
+        status=ImageJob.DONE, last_error="")
+    return ImageJob.DONE
+
+
+def run_feed_job(job_id, max_attempts):
+    """Метод рассылки рецепта по лентам подписчиков автора."""
+    from django.db.models import F
+
+    from .feed import fan_out_recipe
+    from .models import FeedJob
+
+    job = FeedJob.objects.select_related("recipe").get(pk=job_id)
+    FeedJob.objects.filter(pk=job_id).update(attempts=F("attempts") + 1)
+    try:
+        fan_out_recipe(job.recipe)
+    except Exception as error:
+        return retry_or_fail(
+            FeedJob, job, job.attempts + 1, max_attempts, error)
+    FeedJob.objects.filter(pk=job_id).update(
+        status=FeedJob.DONE, last_error="")
+    return FeedJob.DONE
@@ -0,0 +1,7 @@
+from .rebuild_feeds import Command as RebuildCommand
+
+
+class Command(RebuildCommand):
+    help = ("Заполнение лент подписок недостающими рецептами "
+            "без удаления существующих записей.")
+    clear = False
@@ -0,0 +1,169 @@
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.cache import get_cache
+from api.metrics import get_query_budget
+from recipes.models import Ingredient, Recipe, ShoppingList, Tag
+
+User = get_user_model()
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(values, rank):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ("Замер задержек и количества запросов к БД для основных "
+            "эндпоинтов API. Результат выводится в формате JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=50,
+            help="Количество замеряемых запросов к каждому эндпоинту.")
+        parser.add_argument(
+            "--warmup", type=int, default=5,
+            help="Количество прогревочных запросов без замера.")
+        parser.add_argument(
+            "--user",
+            help="Имя пользователя, от которого выполняются запросы.")
+        parser.add_argument(
+            "--cold-cache", action="store_true",
+            help="Очищать кэш ответов API перед каждым запросом.")
+        parser.add_argument(
+            "--only", nargs="*",
+            help="Замерять только перечисленные эндпоинты.")
+        parser.add_argument(
+            "--output", default="-",
+            help="Файл для результата, по умолчанию стандартный вывод.")
+
+    def handle(self, *args, **options):
+        self.cold_cache = options["cold_cache"]
+        user = self.get_user(options["user"])
+        endpoints = self.get_endpoints()
+        if options["only"]:
+            unknown = set(options["only"]) - endpoints.keys()
+            if unknown:
+                raise CommandError(
+                    f"Неизвестные эндпоинты: {', '.join(sorted(unknown))}.")
+            endpoints = {name: endpoints[name] for name in options["only"]}
+
+        client = APIClient()
+        client.force_authenticate(user)
+        results = {}
+        for name, (path, authenticated) in endpoints.items():
+            self.stderr.write(f"{name}: {path}")
+            results[name] = self.measure(
+                client if authenticated else APIClient(), path,
+                options["iterations"], options["warmup"])
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "iterations": options["iterations"],
+            "cold_cache": self.cold_cache,
+            "recipes": Recipe.objects.count(),
+            "endpoints": results,
+        }
+        output = (sys.stdout if options["output"] == "-"
+                  else open(options["output"], "w", encoding="utf-8"))
+        try:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+            output.write("\n")
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+    def get_user(self, username):
+        """Выбор пользователя: заданного или первого со списком покупок."""
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"Пользователь {username} не найден.")
+        user_id = ShoppingList.objects.values_list(
+            "user_id", flat=True).order_by("user_id").first()
+        user = User.objects.filter(pk=user_id).first() or User.objects.first()
+        if user is None:
+            raise CommandError("Нет пользователей, выполните seed_data.")
+        return user
+
+    def get_endpoints(self):
+        """Набор замеряемых эндпоинтов: имя -> (путь, с авторизацией)."""
+        recipe = Recipe.objects.order_by("-favorites_count", "id").first()
+        if recipe is None:
+            raise CommandError("Нет рецептов, выполните seed_data.")
+        tag = Tag.objects.order_by("id").first()
+        ingredient = Ingredient.objects.order_by("id").first()
+        prefix = ingredient.name[:2] if ingredient else "а"
+        return {
+            "recipe_list": ("/api/recipes/", False),
+            "recipe_list_authenticated": ("/api/recipes/", True),
+            "recipe_list_tag": (f"/api/recipes/?tags={tag.slug}", True)
+            if tag else ("/api/recipes/", True),
+            "recipe_list_author": (
+                f"/api/recipes/?author={recipe.author_id}", True),
+            "recipe_list_favorited": (
+                "/api/recipes/?is_favorited=1", True),
+            "recipe_list_search": (
+                f"/api/recipes/?search={recipe.name.split()[0]}", True),
+            "recipe_detail": (f"/api/recipes/{recipe.pk}/", True),
+            "subscriptions": ("/api/users/subscriptions/", True),
+            "ingredient_search": (f"/api/ingredients/?name={prefix}", False),
+            "download_shopping_cart": (
+                "/api/recipes/download_shopping_cart/", True),
+        }
+
+    def request(self, client, path):
+        if self.cold_cache:
+            get_cache().clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(path)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = (time.perf_counter() - started) * 1000
+        return (response.status_code, elapsed, len(queries),
+                getattr(response, "endpoint", None))
+
+    def measure(self, client, path, iterations, warmup):
+        """Замер одного эндпоинта."""
+        for _ in range(warmup):
+            self.request(client, path)
+        timings, queries, statuses = [], [], set()
+        for _ in range(iterations):
+            status, elapsed, count, endpoint = self.request(client, path)
+            timings.append(elapsed)
+            queries.append(count)
+            statuses.add(status)
+        result = {
+            "path": path,
+            "status": sorted(statuses),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "queries": {
+                "min": min(queries),
+                "median": statistics.median(queries),
+                "max": max(queries),
+                "budget": get_query_budget(endpoint),
+            },
+        }
+        for rank in PERCENTILES:
+            result[f"p{rank}_ms"] = round(percentile(timings, rank), 3)
+        return result
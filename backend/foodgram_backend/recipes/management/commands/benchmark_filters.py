@@ -0,0 +1,134 @@
+import json
+import sys
+from urllib.parse import urlencode
+
+from django.core.management import CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, ShoppingList, Tag
+from .explain_api import Command as ExplainCommand
+
+
+class Command(ExplainCommand):
+    help = ("Замер фильтров списка рецептов: задержки, количество "
+            "запросов, повторы рецептов в выдаче и форма планов запросов. "
+            "Для проверки устойчивости планов сравните прогоны на разных "
+            "объемах данных через --baseline. Результат выводится в "
+            "формате JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=30,
+            help="Количество замеряемых запросов к каждому фильтру.")
+        parser.add_argument(
+            "--warmup", type=int, default=3,
+            help="Количество прогревочных запросов без замера.")
+        parser.add_argument(
+            "--user",
+            help="Имя пользователя, от которого выполняются запросы.")
+        parser.add_argument(
+            "--baseline",
+            help="Файл результата другого прогона для сравнения.")
+        parser.add_argument(
+            "--output", default="-",
+            help="Файл для результата, по умолчанию стандартный вывод.")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ("postgresql", "sqlite"):
+            raise CommandError(
+                f"База данных {connection.vendor} не поддерживается.")
+        self.cold_cache = False
+        self.min_rows = 0
+        self.table_sizes = {}
+        self.tables = set(connection.introspection.table_names())
+        user = self.get_user(options["user"])
+        client = APIClient()
+        client.force_authenticate(user)
+
+        results = {}
+        for name, params in self.get_filters().items():
+            path = f"/api/recipes/?{urlencode(params, doseq=True)}"
+            self.stderr.write(f"{name}: {path}")
+            result = self.measure(
+                client, path, options["iterations"], options["warmup"])
+            ids = [recipe["id"]
+                   for recipe in client.get(path).json()["results"]]
+            result["duplicates"] = len(ids) - len(set(ids))
+            result["plans"] = [self.get_plan_shape(sql, params)
+                               for sql, params in self.capture(client, path)]
+            results[name] = result
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "iterations": options["iterations"],
+            "recipes": Recipe.objects.count(),
+            "favorites": Favorite.objects.count(),
+            "shopping_lists": ShoppingList.objects.count(),
+            "filters": results,
+        }
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                report["baseline"] = self.compare(report, json.load(file))
+        output = (sys.stdout if options["output"] == "-"
+                  else open(options["output"], "w", encoding="utf-8"))
+        try:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+            output.write("\n")
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+    def get_filters(self):
+        """Набор замеряемых фильтров: имя -> параметры запроса."""
+        slugs = list(Tag.objects.order_by("id").values_list(
+            "slug", flat=True)[:2])
+        recipe = Recipe.objects.order_by("-favorites_count", "id").first()
+        if not slugs or recipe is None:
+            raise CommandError("Нет тегов или рецептов, выполните seed_data.")
+        return {
+            "tag": {"tags": slugs[:1]},
+            "tags_or": {"tags": slugs},
+            "author_tags": {"author": recipe.author_id, "tags": slugs},
+            "favorited": {"is_favorited": 1},
+            "not_favorited": {"is_favorited": 0},
+            "in_shopping_cart": {"is_in_shopping_cart": 1},
+            "favorited_in_shopping_cart": {
+                "is_favorited": 1, "is_in_shopping_cart": 1},
+            "all": {"tags": slugs, "is_favorited": 1,
+                    "is_in_shopping_cart": 1},
+        }
+
+    def get_plan_shape(self, sql, params):
+        """Метод получения формы плана без оценок строк и стоимости."""
+        plan, _, _ = self.explain(sql, params)
+        if connection.vendor != "postgresql":
+            return plan
+        shape = []
+        nodes = [(plan["Plan"], 0)]
+        while nodes:
+            node, depth = nodes.pop()
+            nodes.extend((child, depth + 1)
+                         for child in reversed(node.get("Plans", ())))
+            parts = [node["Node Type"], node.get("Relation Name"),
+                     node.get("Index Name")]
+            shape.append("  " * depth + " ".join(filter(None, parts)))
+        return shape
+
+    def compare(self, report, baseline):
+        """Метод сравнения с прогоном на другом объеме данных."""
+        result = {"recipes": baseline.get("recipes"), "filters": {}}
+        for name, current in report["filters"].items():
+            previous = baseline.get("filters", {}).get(name)
+            if previous is None:
+                continue
+            result["filters"][name] = {
+                "plan_changed": current["plans"] != previous["plans"],
+                "queries_changed": (current["queries"]["max"]
+                                    != previous["queries"]["max"]),
+                "p95_ratio": round(
+                    current["p95_ms"] / previous["p95_ms"], 3),
+            }
+        return result
@@ -0,0 +1,165 @@
+import json
+import re
+import sys
+
+from django.core.management import CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.cache import get_cache
+from .benchmark_api import Command as BenchmarkCommand
+
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+class Command(BenchmarkCommand):
+    help = ("Планы выполнения запросов к БД основных эндпоинтов API "
+            "(EXPLAIN ANALYZE в PostgreSQL, EXPLAIN QUERY PLAN в SQLite) "
+            "с отметкой последовательных сканирований больших таблиц. "
+            "Результат выводится в формате JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            help="Имя пользователя, от которого выполняются запросы.")
+        parser.add_argument(
+            "--only", nargs="*",
+            help="Проверять только перечисленные эндпоинты.")
+        parser.add_argument(
+            "--min-rows", type=int, default=1000,
+            help="Отмечать последовательное сканирование, только если "
+                 "прочитано не меньше строк.")
+        parser.add_argument(
+            "--plans", action="store_true",
+            help="Включить в результат полные планы запросов.")
+        parser.add_argument(
+            "--fail-on-seq-scan", action="store_true",
+            help="Завершиться с ошибкой при найденных сканированиях.")
+        parser.add_argument(
+            "--output", default="-",
+            help="Файл для результата, по умолчанию стандартный вывод.")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ("postgresql", "sqlite"):
+            raise CommandError(
+                f"База данных {connection.vendor} не поддерживается.")
+        self.min_rows = options["min_rows"]
+        self.table_sizes = {}
+        self.tables = set(connection.introspection.table_names())
+        user = self.get_user(options["user"])
+        endpoints = self.get_endpoints()
+        if options["only"]:
+            unknown = set(options["only"]) - endpoints.keys()
+            if unknown:
+                raise CommandError(
+                    f"Неизвестные эндпоинты: {', '.join(sorted(unknown))}.")
+            endpoints = {name: endpoints[name] for name in options["only"]}
+
+        client = APIClient()
+        client.force_authenticate(user)
+        results = {}
+        flagged = 0
+        for name, (path, authenticated) in endpoints.items():
+            self.stderr.write(f"{name}: {path}")
+            queries = []
+            for sql, params in self.capture(
+                    client if authenticated else APIClient(), path):
+                plan, seq_scans, elapsed = self.explain(sql, params)
+                query = {"sql": sql, "seq_scans": seq_scans}
+                if elapsed is not None:
+                    query["execution_ms"] = elapsed
+                if options["plans"]:
+                    query["plan"] = plan
+                queries.append(query)
+                flagged += len(seq_scans)
+            results[name] = {"path": path, "queries": queries}
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "min_rows": self.min_rows,
+            "seq_scans": flagged,
+            "endpoints": results,
+        }
+        output = (sys.stdout if options["output"] == "-"
+                  else open(options["output"], "w", encoding="utf-8"))
+        try:
+            json.dump(report, output, ensure_ascii=False, indent=2,
+                      default=str)
+            output.write("\n")
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        if flagged and options["fail_on_seq_scan"]:
+            raise CommandError(
+                f"Найдено последовательных сканирований: {flagged}.")
+
+    def capture(self, client, path):
+        """Метод сбора уникальных SELECT-запросов одного эндпоинта."""
+        queries = {}
+
+        def wrapper(execute, sql, params, many, context):
+            if not many and sql.lstrip().upper().startswith("SELECT"):
+                queries.setdefault(sql, params)
+            return execute(sql, params, many, context)
+
+        get_cache().clear()
+        with connection.execute_wrapper(wrapper):
+            response = client.get(path)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return list(queries.items())
+
+    def explain(self, sql, params):
+        """Метод получения плана запроса и сканирований больших таблиц."""
+        if connection.vendor == "postgresql":
+            return self.explain_postgresql(sql, params)
+        return self.explain_sqlite(sql, params)
+
+    def explain_postgresql(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        plan = plan[0]
+        seq_scans = []
+        nodes = [plan["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.get("Plans", ()))
+            if node["Node Type"] != "Seq Scan":
+                continue
+            rows = (node.get("Actual Rows", 0)
+                    + node.get("Rows Removed by Filter", 0)) * node.get(
+                "Actual Loops", 1)
+            if rows >= self.min_rows:
+                seq_scans.append(
+                    {"table": node["Relation Name"], "rows": rows})
+        return plan, seq_scans, plan.get("Execution Time")
+
+    def explain_sqlite(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        seq_scans = []
+        for detail in plan:
+            match = SQLITE_SCAN.match(detail)
+            if (match is None or " USING " in detail
+                    or match.group(1) not in self.tables):
+                continue
+            rows = self.get_table_size(match.group(1))
+            if rows >= self.min_rows:
+                seq_scans.append({"table": match.group(1), "rows": rows})
+        return plan, seq_scans, None
+
+    def get_table_size(self, table):
+        """Метод подсчета строк таблицы, в SQLite нет фактических строк."""
+        if table not in self.table_sizes:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+                self.table_sizes[table] = cursor.fetchone()[0]
+        return self.table_sizes[table]
@@ -0,0 +1,102 @@
+import json
+import os
+import shutil
+import sys
+from itertools import groupby
+
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe, RecipeIngredients
+
+
+def group_by_recipe(rows):
+    """Группировка потока строк, упорядоченных по id рецепта."""
+    return groupby(rows, key=lambda row: row[0])
+
+
+class Command(BaseCommand):
+    help = "Выгрузка рецептов в формате JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", default="-",
+            help="Файл для выгрузки, по умолчанию стандартный вывод.")
+        parser.add_argument(
+            "--images-dir",
+            help="Каталог, куда скопировать файлы изображений.")
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000,
+            help="Размер порции, читаемой из курсора базы данных.")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        recipes = Recipe.objects.order_by("id").values_list(
+            "id", "name", "text", "cooking_time", "image", "pub_date",
+            "author__email", "author__username", "author__first_name",
+            "author__last_name").iterator(chunk_size=chunk_size)
+        tags = group_by_recipe(Recipe.tags.through.objects.order_by(
+            "recipe_id").values_list(
+            "recipe_id", "tag__slug", "tag__name",
+            "tag__color").iterator(chunk_size=chunk_size))
+        ingredients = group_by_recipe(RecipeIngredients.objects.order_by(
+            "recipe_id", "ingredient__name").values_list(
+            "recipe_id", "ingredient__name", "ingredient__measurement_unit",
+            "amount").iterator(chunk_size=chunk_size))
+        next_tags = next(tags, None)
+        next_ingredients = next(ingredients, None)
+
+        output = (sys.stdout if options["output"] == "-"
+                  else open(options["output"], "w", encoding="utf-8"))
+        exported = 0
+        try:
+            for (pk, name, text, cooking_time, image, pub_date, email,
+                 username, first_name, last_name) in recipes:
+                recipe_tags = []
+                while next_tags and next_tags[0] <= pk:
+                    if next_tags[0] == pk:
+                        recipe_tags = [
+                            {"slug": slug, "name": tag, "color": color}
+                            for _, slug, tag, color in next_tags[1]]
+                    next_tags = next(tags, None)
+                recipe_ingredients = []
+                while next_ingredients and next_ingredients[0] <= pk:
+                    if next_ingredients[0] == pk:
+                        recipe_ingredients = [
+                            {"name": ingredient, "measurement_unit": unit,
+                             "amount": amount}
+                            for _, ingredient, unit, amount
+                            in next_ingredients[1]]
+                    next_ingredients = next(ingredients, None)
+                if image and options["images_dir"]:
+                    self.copy_image(image, options["images_dir"])
+                output.write(json.dumps({
+                    "name": name,
+                    "text": text,
+                    "cooking_time": cooking_time,
+                    "pub_date": pub_date.isoformat(),
+                    "image": image or None,
+                    "author": {
+                        "email": email,
+                        "username": username,
+                        "first_name": first_name,
+                        "last_name": last_name},
+                    "tags": recipe_tags,
+                    "ingredients": recipe_ingredients,
+                }, ensure_ascii=False) + "\n")
+                exported += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(self.style.SUCCESS(
+            f"Выгружено рецептов: {exported}."))
+
+    def copy_image(self, name, images_dir):
+        """Копирование файла изображения рядом с выгрузкой."""
+        target = os.path.join(images_dir, name)
+        if os.path.exists(target) or not default_storage.exists(name):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with default_storage.open(name, "rb") as source:
+            with open(target, "wb") as destination:
+                shutil.copyfileobj(source, destination)
@@ -0,0 +1,244 @@
+import json
+import os
+import sys
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from api.cache import FACETS, RECIPES, invalidate
+from recipes.counters import recount_counters
+from recipes.feed import rebuild_feed
+from recipes.images import process_recipe_image
+from recipes.indexes import recipe_ingredient_index
+from recipes.models import (ImageJob, Ingredient, Recipe, RecipeIngredients,
+                            Subscription, Tag)
+from recipes.search import update_search_vector
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Загрузка рецептов из файла JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--input", default="-",
+            help="Файл с рецептами, по умолчанию стандартный ввод.")
+        parser.add_argument(
+            "--images-dir",
+            help="Каталог с файлами изображений из export_recipes.")
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Количество рецептов, загружаемых в одной транзакции.")
+
+    def handle(self, *args, **options):
+        self.images_dir = options["images_dir"]
+        self.tags = dict(Tag.objects.values_list("slug", "id"))
+        self.authors = {}
+        self.ingredients = {}
+        self.imported = self.skipped = 0
+        self.imported_authors = set()
+
+        source = (sys.stdin if options["input"] == "-"
+                  else open(options["input"], encoding="utf-8"))
+        try:
+            lines = (json.loads(line) for line in source if line.strip())
+            while True:
+                batch = list(islice(lines, options["batch_size"]))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    self.import_batch(batch)
+                self.stdout.write(
+                    f"Загружено: {self.imported}, пропущено: {self.skipped}")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        recount_counters()
+        self.update_feeds()
+        invalidate(RECIPES, FACETS)
+        self.stdout.write(self.style.SUCCESS(
+            f"Рецепты загружены: {self.imported}, "
+            f"пропущено существующих и повторных: {self.skipped}."))
+
+    def update_feeds(self):
+        """Добавление загруженных рецептов в ленты подписчиков авторов.
+
+        Рецепты создаются через bulk_create без сигналов, поэтому ленты
+        дополняются недостающими записями здесь.
+        """
+        followers = Subscription.objects.filter(
+            subscribing_id__in=self.imported_authors).order_by(
+            "user_id").values_list("user_id", flat=True).distinct()
+        for user_id in followers.iterator():
+            rebuild_feed(user_id, clear=False)
+
+    def resolve_tags(self, batch):
+        """Получение id тегов по слагу с созданием недостающих.
+
+        Тег из выгрузки задается словарем со слагом, названием и цветом;
+        тег, заданный только слагом, должен уже существовать.
+        """
+        unknown = set()
+        for item in batch:
+            for tag in item["tags"]:
+                if isinstance(tag, str):
+                    if tag not in self.tags:
+                        unknown.add(tag)
+                elif tag["slug"] not in self.tags:
+                    self.tags[tag["slug"]] = Tag.objects.get_or_create(
+                        slug=tag["slug"], defaults={
+                            "name": tag["name"], "color": tag["color"]},
+                    )[0].pk
+        if unknown:
+            raise CommandError(
+                f"Теги не найдены: {', '.join(sorted(unknown))}. "
+                "Создайте их или выгрузите рецепты заново.")
+
+    def resolve_authors(self, batch):
+        """Получение id авторов по email с созданием недостающих."""
+        authors = {item["author"]["email"]: item["author"] for item in batch}
+        missing = authors.keys() - self.authors.keys()
+        if not missing:
+            return
+        self.authors.update(User.objects.filter(
+            email__in=missing).values_list("email", "id"))
+        new = []
+        for email in missing - self.authors.keys():
+            user = User(**authors[email])
+            user.set_unusable_password()
+            new.append(user)
+        if new:
+            User.objects.bulk_create(new, ignore_conflicts=True)
+            self.authors.update(User.objects.filter(
+                email__in=[user.email for user in new]).values_list(
+                "email", "id"))
+        for user in new:
+            if user.email not in self.authors:
+                self.authors[user.email] = self.create_renamed_author(user)
+
+    def create_renamed_author(self, user):
+        """Создание автора, чье имя пользователя уже занято."""
+        base = user.username[:140]
+        number = 1
+        while User.objects.filter(username=f"{base}-{number}").exists():
+            number += 1
+        username = user.username
+        user.username = f"{base}-{number}"
+        user.save()
+        self.stderr.write(
+            f"Имя пользователя {username} занято, автор {user.email} "
+            f"создан как {user.username}.")
+        return user.pk
+
+    def resolve_ingredients(self, batch):
+        """Получение id ингредиентов по названию и единице измерения."""
+        keys = {
+            (item["name"], item["measurement_unit"])
+            for recipe in batch for item in recipe["ingredients"]}
+        missing = keys - self.ingredients.keys()
+        if not missing:
+            return
+        for pk, name, unit in Ingredient.objects.filter(
+                name__in={name for name, _ in missing}).values_list(
+                "id", "name", "measurement_unit"):
+            self.ingredients[(name, unit)] = pk
+        new = missing - self.ingredients.keys()
+        if new:
+            Ingredient.objects.bulk_create(
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in new)
+            for pk, name, unit in Ingredient.objects.filter(
+                    name__in={name for name, _ in new}).values_list(
+                    "id", "name", "measurement_unit"):
+                self.ingredients[(name, unit)] = pk
+
+    def resolve_image(self, name):
+        """Копирование изображения из каталога выгрузки в хранилище."""
+        if not name:
+            return None
+        if default_storage.exists(name) or not self.images_dir:
+            return name
+        path = os.path.join(self.images_dir, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as image:
+            return default_storage.save(name, File(image))
+
+    def import_batch(self, batch):
+        existing = set(Recipe.objects.filter(
+            name__in=[item["name"] for item in batch]).values_list(
+            "name", flat=True))
+        unique = {}
+        for item in batch:
+            if item["name"] not in existing:
+                unique.setdefault(item["name"], item)
+        self.skipped += len(batch) - len(unique)
+        batch = list(unique.values())
+        if not batch:
+            return
+        self.resolve_tags(batch)
+        self.resolve_authors(batch)
+        self.resolve_ingredients(batch)
+
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                name=item["name"],
+                text=item["text"],
+                cooking_time=item["cooking_time"],
+                image=self.resolve_image(item.get("image")),
+                author_id=self.authors[item["author"]["email"]])
+            for item in batch)
+        ids = dict(Recipe.objects.filter(
+            name__in=[recipe.name for recipe in recipes]).values_list(
+            "name", "id"))
+        for recipe, item in zip(recipes, batch):
+            recipe.pk = ids[recipe.name]
+            recipe.pub_date = recipe.updated_at = parse_datetime(
+                item["pub_date"])
+        Recipe.objects.bulk_update(recipes, ("pub_date", "updated_at"))
+
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
+                recipe_id=recipe.pk,
+                ingredient_id=self.ingredients[
+                    (ingredient["name"], ingredient["measurement_unit"])],
+                amount=ingredient["amount"])
+            for recipe, item in zip(recipes, batch)
+            for ingredient in item["ingredients"])
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(
+                recipe_id=recipe.pk,
+                tag_id=self.tags[tag if isinstance(tag, str) else tag["slug"]])
+            for recipe, item in zip(recipes, batch)
+            for tag in item["tags"])
+
+        update_search_vector(Recipe.objects.filter(pk__in=ids.values()))
+        ingredients = {
+            recipe.pk: [
+                self.ingredients[(ingredient["name"],
+                                  ingredient["measurement_unit"])]
+                for ingredient in item["ingredients"]]
+            for recipe, item in zip(recipes, batch)}
+
+        def update_index():
+            for recipe_id, ingredient_ids in ingredients.items():
+                recipe_ingredient_index.set_recipe(recipe_id, ingredient_ids)
+
+        transaction.on_commit(update_index)
+        self.imported_authors.update(recipe.author_id for recipe in recipes)
+        with_images = [recipe for recipe in recipes if recipe.image]
+        if settings.IMAGE_PROCESSING_ASYNC:
+            ImageJob.objects.bulk_create(
+                ImageJob(recipe_id=recipe.pk) for recipe in with_images)
+        else:
+            for recipe in with_images:
+                process_recipe_image(recipe)
+        self.imported += len(recipes)
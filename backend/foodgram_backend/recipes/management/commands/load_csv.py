@@ -1,28 +1,135 @@
 import csv
+import io
+import json
 import os
+from itertools import islice
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
 
 from recipes.models import Ingredient
 
+READ_CHUNK_SIZE = 64 * 1024
+
+CREATE_STAGING = """
+CREATE TEMPORARY TABLE ingredient_staging (
+    name varchar(200),
+    measurement_unit varchar(200)
+) ON COMMIT DROP
+"""
+
+COPY_STAGING = """
+COPY ingredient_staging (name, measurement_unit) FROM STDIN WITH (FORMAT csv)
+"""
+
+INSERT_FROM_STAGING = """
+INSERT INTO {table} (name, measurement_unit)
+SELECT DISTINCT staging.name, staging.measurement_unit
+FROM ingredient_staging AS staging
+WHERE NOT EXISTS (
+    SELECT 1 FROM {table} AS ingredient
+    WHERE ingredient.name = staging.name
+    AND ingredient.measurement_unit = staging.measurement_unit)
+"""
+
+
+def read_csv(path):
+    with open(path, mode="r", encoding="utf-8") as file:
+        for row in csv.reader(file, delimiter=","):
+            yield row[0], row[1]
+
+
+def read_json(path):
+    """Потоковое чтение JSON-массива объектов без загрузки файла целиком."""
+    decoder = json.JSONDecoder()
+    with open(path, mode="r", encoding="utf-8") as file:
+        buffer = file.read(READ_CHUNK_SIZE).lstrip()
+        if not buffer.startswith("["):
+            raise CommandError("Ожидается JSON-массив ингредиентов.")
+        buffer = buffer[1:]
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                chunk = file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    raise CommandError("Файл JSON поврежден.")
+                buffer += chunk
+                continue
+            yield item["name"], item["measurement_unit"]
+            buffer = buffer[end:]
+
 
 class Command(BaseCommand):
     help = "Загрузка ингредиентов в базу данных."
 
-    def handle(self, *args, **kwargs):
-        base_dir = settings.BASE_DIR
-        data_path = os.path.join(base_dir, "data", "ingredients.csv")
-
-        with open(data_path, mode="r", encoding="utf-8") as file:
-            csv_reader = csv.reader(file, delimiter=",")
-            for row in csv_reader:
-                _, created = Ingredient.objects.get_or_create(
-                    name=row[0],
-                    defaults={"measurement_unit": row[1]})
-                if created:
-                    self.stdout.write(f"Создан ингредиент: {row[0]}")
-                else:
-                    self.stdout.write(f"Ингредиент {row[0]} уже существует")
-            self.stdout.write(self.style.SUCCESS(
-                "Ингредиенты успешно загружены."))
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=os.path.join(settings.BASE_DIR, "data", "ingredients.csv"),
+            help="Путь к файлу ингредиентов в формате CSV или JSON.")
+        parser.add_argument(
+            "--batch-size", type=int, default=5000,
+            help="Количество строк, загружаемых за один запрос.")
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Посчитать новые ингредиенты и откатить изменения.")
+        parser.add_argument(
+            "--no-copy", action="store_true",
+            help="Не использовать COPY даже на PostgreSQL.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        reader = read_json if path.endswith(".json") else read_csv
+        rows = reader(path)
+        use_copy = (connection.vendor == "postgresql"
+                    and not options["no_copy"])
+        load_batch = self.copy_batch if use_copy else self.bulk_create_batch
+
+        total = inserted = 0
+        with transaction.atomic():
+            if use_copy:
+                with connection.cursor() as cursor:
+                    cursor.execute(CREATE_STAGING)
+            while True:
+                batch = list(islice(rows, options["batch_size"]))
+                if not batch:
+                    break
+                inserted += load_batch(batch)
+                total += len(batch)
+                self.stdout.write(f"Обработано строк: {total}")
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ингредиенты успешно загружены. Всего строк: {total}, "
+            f"новых: {inserted}, уже существовало: {total - inserted}."
+            + (" Пробный запуск, изменения отменены."
+               if options["dry_run"] else "")))
+
+    def copy_batch(self, batch):
+        """Загрузка пакета через COPY во временную таблицу."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute("TRUNCATE ingredient_staging")
+            cursor.copy_expert(COPY_STAGING, buffer)
+            cursor.execute(INSERT_FROM_STAGING.format(
+                table=Ingredient._meta.db_table))
+            return cursor.rowcount
+
+    def bulk_create_batch(self, batch):
+        """Загрузка пакета через bulk_create для остальных СУБД."""
+        batch = dict.fromkeys(batch)
+        existing = set(Ingredient.objects.filter(
+            name__in={name for name, _ in batch}).values_list(
+            "name", "measurement_unit"))
+        new = [Ingredient(name=name, measurement_unit=unit)
+               for name, unit in batch if (name, unit) not in existing]
+        Ingredient.objects.bulk_create(new)
+        return len(new)
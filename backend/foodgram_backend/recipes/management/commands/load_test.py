@@ -0,0 +1,187 @@
+import asyncio
+import json
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+
+from .benchmark_api import PERCENTILES, percentile
+
+DEFAULT_PATHS = (
+    "/api/recipes/",
+    "/api/recipes/?tags=breakfast",
+    "/api/tags/",
+    "/api/ingredients/?name=аб",
+)
+
+
+class HTTPConnection:
+    """Минимальный HTTP/1.1-клиент на asyncio с поддержкой keep-alive."""
+
+    def __init__(self, host, port, headers):
+        self.host = host
+        self.port = port
+        self.headers = headers
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port)
+        request = [f"GET {path} HTTP/1.1", f"Host: {self.host}"]
+        request += [f"{name}: {value}" for name, value in self.headers]
+        self.writer.write(("\r\n".join(request) + "\r\n\r\n").encode())
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode("latin1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+        if "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+        else:
+            await self.reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection") == "close":
+            await self.close()
+        return status
+
+
+class Command(BaseCommand):
+    help = ("Нагрузочный тест запущенного сервера: пропускная способность "
+            "и перцентили задержек при заданном числе одновременных "
+            "клиентов. Результат выводится в формате JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--base-url", default="http://127.0.0.1:7000",
+            help="Адрес сервера.")
+        parser.add_argument(
+            "--paths", nargs="*", default=DEFAULT_PATHS,
+            help="Пути, запрашиваемые клиентами по кругу.")
+        parser.add_argument(
+            "--concurrency", type=int, default=200,
+            help="Количество одновременных клиентов.")
+        parser.add_argument(
+            "--duration", type=float, default=30,
+            help="Длительность теста в секундах.")
+        parser.add_argument(
+            "--token", help="Токен для заголовка Authorization.")
+        parser.add_argument(
+            "--label", default="",
+            help="Метка прогона, например wsgi или asgi.")
+        parser.add_argument(
+            "--baseline",
+            help="Файл результата другого прогона для сравнения.")
+        parser.add_argument(
+            "--output", default="-",
+            help="Файл для результата, по умолчанию стандартный вывод.")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["base_url"])
+        if url.scheme != "http":
+            raise CommandError("Поддерживается только http.")
+        headers = [("Accept", "application/json")]
+        if options["token"]:
+            headers.append(("Authorization", f"Token {options['token']}"))
+        samples, errors, elapsed = asyncio.run(self.run(
+            url.hostname, url.port or 80, headers, options["paths"],
+            options["concurrency"], options["duration"]))
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "label": options["label"],
+            "base_url": options["base_url"],
+            "concurrency": options["concurrency"],
+            "duration_s": round(elapsed, 3),
+            "total": self.summarize(
+                [latency for path_samples in samples.values()
+                 for latency in path_samples], errors, elapsed),
+            "paths": {
+                path: self.summarize(path_samples, 0, elapsed)
+                for path, path_samples in samples.items()},
+        }
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = json.load(file)
+            report["baseline"] = {
+                "label": baseline.get("label", ""),
+                "throughput_ratio": round(
+                    report["total"]["throughput_rps"]
+                    / baseline["total"]["throughput_rps"], 3),
+                "p99_ratio": round(
+                    report["total"]["p99_ms"] / baseline["total"]["p99_ms"],
+                    3),
+            }
+        output = (sys.stdout if options["output"] == "-"
+                  else open(options["output"], "w", encoding="utf-8"))
+        try:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+            output.write("\n")
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+    async def run(self, host, port, headers, paths, concurrency, duration):
+        samples = {path: [] for path in paths}
+        errors = 0
+        deadline = time.perf_counter() + duration
+
+        async def client(number):
+            nonlocal errors
+            connection = HTTPConnection(host, port, headers)
+            index = number
+            while time.perf_counter() < deadline:
+                path = paths[index % len(paths)]
+                index += 1
+                started = time.perf_counter()
+                try:
+                    status = await connection.get(path)
+                except (OSError, ValueError, IndexError,
+                        asyncio.IncompleteReadError):
+                    status = None
+                    await connection.close()
+                if status is None or status >= 500:
+                    errors += 1
+                    continue
+                samples[path].append(
+                    (time.perf_counter() - started) * 1000)
+            await connection.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(number)
+                               for number in range(concurrency)))
+        return samples, errors, time.perf_counter() - started
+
+    def summarize(self, latencies, errors, elapsed):
+        """Сводка по задержкам одной группы запросов."""
+        result = {
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+        }
+        if latencies:
+            result["mean_ms"] = round(statistics.fmean(latencies), 3)
+            result["max_ms"] = round(max(latencies), 3)
+            for rank in PERCENTILES:
+                result[f"p{rank}_ms"] = round(
+                    percentile(latencies, rank), 3)
+        return result
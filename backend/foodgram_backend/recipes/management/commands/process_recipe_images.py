@@ -0,0 +1,27 @@
+from django.core.management import BaseCommand
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Создание вариантов изображений для уже загруженных рецептов."
+
+    def handle(self, *args, **kwargs):
+        processed = 0
+        failed = 0
+        recipes = Recipe.objects.exclude(image="").exclude(
+            image__isnull=True).defer("search_vector")
+        for recipe in recipes.iterator():
+            if recipe.image.name == recipe.image_variants.get("source"):
+                continue
+            try:
+                process_recipe_image(recipe)
+            except OSError as error:
+                failed += 1
+                self.stderr.write(
+                    f"Не удалось обработать {recipe.image.name}: {error}")
+                continue
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано изображений: {processed}, с ошибками: {failed}."))
@@ -0,0 +1,30 @@
+from django.core.management import BaseCommand
+
+from recipes.feed import rebuild_feed
+from recipes.models import FeedItem, Subscription
+
+
+class Command(BaseCommand):
+    help = "Пересборка лент подписок по текущим подпискам."
+    clear = True
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", nargs="*", type=int,
+            help="Идентификаторы пользователей, по умолчанию все.")
+
+    def handle(self, *args, **options):
+        user_ids = options["users"]
+        if not user_ids:
+            if self.clear:
+                FeedItem.objects.exclude(
+                    user_id__in=Subscription.objects.values(
+                        "user_id")).delete()
+            user_ids = list(Subscription.objects.order_by(
+                "user_id").values_list("user_id", flat=True).distinct())
+        for number, user_id in enumerate(user_ids, 1):
+            rebuild_feed(user_id, clear=self.clear)
+            if number % 1000 == 0:
+                self.stdout.write(f"Обработано лент: {number}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано лент: {len(user_ids)}."))
@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+
+from recipes.counters import recount_counters
+
+
+class Command(BaseCommand):
+    help = "Пересчет счетчиков рецептов, избранного и списков покупок."
+
+    def handle(self, *args, **kwargs):
+        users, recipes = recount_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f"Счетчики пересчитаны: пользователей {users}, "
+            f"рецептов {recipes}."))
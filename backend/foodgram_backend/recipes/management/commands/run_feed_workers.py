@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.jobs import claim_jobs, requeue_stale_jobs, run_feed_job
+from recipes.models import FeedJob
+
+
+class Command(BaseCommand):
+    help = "Запуск обработчика очереди рассылки новых рецептов по лентам."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=10,
+            help="Количество задач, захватываемых за один опрос.")
+        parser.add_argument(
+            "--max-attempts", type=int,
+            default=settings.FEED_WORKER_MAX_ATTEMPTS,
+            help="Количество попыток до перевода задачи в ошибку.")
+        parser.add_argument(
+            "--poll-interval", type=float, default=1.0,
+            help="Пауза между опросами пустой очереди, в секундах.")
+        parser.add_argument(
+            "--stale-after", type=int, default=600,
+            help="Через сколько секунд вернуть зависшую задачу в очередь.")
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Обработать текущую очередь и завершиться.")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(FeedJob, options["stale_after"])
+        if requeued:
+            self.stdout.write(f"Возвращено в очередь задач: {requeued}")
+
+        while True:
+            jobs = claim_jobs(FeedJob, max(options["batch_size"], 1))
+            if not jobs:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+            for job_id in jobs:
+                status = run_feed_job(job_id, options["max_attempts"])
+                self.stdout.write(f"Задача {job_id}: {status}")
+        self.stdout.write(self.style.SUCCESS("Очередь обработана."))
@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import connections
+
+from recipes.jobs import (claim_jobs, init_worker, requeue_stale_jobs,
+                          run_image_job)
+from recipes.models import ImageJob
+
+
+class Command(BaseCommand):
+    help = "Запуск пула процессов для фоновой обработки изображений."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int,
+            default=settings.IMAGE_WORKER_CONCURRENCY,
+            help="Количество процессов обработки.")
+        parser.add_argument(
+            "--max-attempts", type=int,
+            default=settings.IMAGE_WORKER_MAX_ATTEMPTS,
+            help="Количество попыток до перевода задачи в ошибку.")
+        parser.add_argument(
+            "--poll-interval", type=float, default=2.0,
+            help="Пауза между опросами пустой очереди, в секундах.")
+        parser.add_argument(
+            "--stale-after", type=int, default=600,
+            help="Через сколько секунд вернуть зависшую задачу в очередь.")
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Обработать текущую очередь и завершиться.")
+
+    def handle(self, *args, **options):
+        concurrency = max(options["concurrency"], 1)
+        requeued = requeue_stale_jobs(ImageJob, options["stale_after"])
+        if requeued:
+            self.stdout.write(f"Возвращено в очередь задач: {requeued}")
+
+        connections.close_all()
+        with ProcessPoolExecutor(
+                max_workers=concurrency, initializer=init_worker) as pool:
+            while True:
+                jobs = claim_jobs(ImageJob, concurrency)
+                if not jobs:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+                futures = {
+                    pool.submit(run_image_job, job_id,
+                                options["max_attempts"]): job_id
+                    for job_id in jobs}
+                wait(futures)
+                for future, job_id in futures.items():
+                    error = future.exception()
+                    status = error or future.result()
+                    self.stdout.write(f"Задача {job_id}: {status}")
+        self.stdout.write(self.style.SUCCESS("Очередь обработана."))
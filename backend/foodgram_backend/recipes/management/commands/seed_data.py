@@ -0,0 +1,163 @@
+import random
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.counters import recount_counters
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredients,
+                            ShoppingList, Subscription, Tag)
+from recipes.search import update_search_vector
+
+User = get_user_model()
+
+SEED_PASSWORD = "seed-password"
+DEFAULT_TAGS = (
+    ("Завтрак", "#E26C2D", "breakfast"),
+    ("Обед", "#49B64E", "lunch"),
+    ("Ужин", "#8775D2", "dinner"),
+)
+
+
+def batched(iterable, size):
+    """Разбиение итератора на списки заданного размера."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def sample_pairs(rng, left, right, count, exclude_equal=False):
+    """Генерация уникальных пар (left, right) в заданном количестве."""
+    limit = len(left) * len(right) - (
+        min(len(left), len(right)) if exclude_equal else 0)
+    count = min(count, limit)
+    pairs = set()
+    while len(pairs) < count:
+        pair = (rng.choice(left), rng.choice(right))
+        if not (exclude_equal and pair[0] == pair[1]):
+            pairs.add(pair)
+    return sorted(pairs)
+
+
+class Command(BaseCommand):
+    help = "Генерация тестовых данных для нагрузочных замеров."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument(
+            "--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--favorites", type=int, default=5000)
+        parser.add_argument("--carts", type=int, default=2000)
+        parser.add_argument("--subscriptions", type=int, default=1000)
+        parser.add_argument(
+            "--seed", type=int, default=42,
+            help="Начальное значение генератора случайных чисел.")
+        parser.add_argument(
+            "--prefix", default="seed",
+            help="Префикс имен пользователей и рецептов.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--clear", action="store_true",
+            help="Удалить ранее сгенерированные данные с этим префиксом.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        prefix = options["prefix"]
+        self.batch_size = options["batch_size"]
+        seed_users = User.objects.filter(username__startswith=f"{prefix}_")
+        if options["clear"]:
+            seed_users.delete()
+        elif seed_users.exists():
+            raise CommandError(
+                f"Данные с префиксом {prefix} уже есть, "
+                "используйте --clear для их пересоздания.")
+        ingredients = list(
+            Ingredient.objects.order_by("id").values_list("id", flat=True))
+        if len(ingredients) < options["ingredients_per_recipe"]:
+            raise CommandError(
+                "Недостаточно ингредиентов, сначала выполните load_csv.")
+
+        with transaction.atomic():
+            tags = self.create_tags()
+            users = self.create_users(prefix, options["users"])
+            recipes = self.create_recipes(
+                rng, prefix, users, options["recipes"])
+            self.create_links(
+                rng, recipes, tags, ingredients,
+                options["ingredients_per_recipe"])
+            self.bulk_create(Favorite, (
+                Favorite(user_id=user, recipe_id=recipe)
+                for user, recipe in sample_pairs(
+                    rng, users, recipes, options["favorites"])))
+            self.bulk_create(ShoppingList, (
+                ShoppingList(user_id=user, recipe_id=recipe)
+                for user, recipe in sample_pairs(
+                    rng, users, recipes, options["carts"])))
+            self.bulk_create(Subscription, (
+                Subscription(user_id=user, subscribing_id=author)
+                for user, author in sample_pairs(
+                    rng, users, users, options["subscriptions"],
+                    exclude_equal=True)))
+            update_search_vector(Recipe.objects.filter(pk__in=recipes))
+            recount_counters()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано пользователей: {len(users)}, рецептов: {len(recipes)}. "
+            f"Пароль пользователей: {SEED_PASSWORD}."))
+
+    def bulk_create(self, model, objects):
+        """Пакетная вставка объектов из итератора."""
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch)
+
+    def create_tags(self):
+        """Получение тегов с созданием стандартных при их отсутствии."""
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS)
+        return list(Tag.objects.order_by("id").values_list("id", flat=True))
+
+    def create_users(self, prefix, count):
+        password = make_password(SEED_PASSWORD)
+        self.bulk_create(User, (
+            User(
+                username=f"{prefix}_{number}",
+                email=f"{prefix}_{number}@example.com",
+                first_name="Пользователь",
+                last_name=str(number),
+                password=password)
+            for number in range(count)))
+        return list(User.objects.filter(
+            username__startswith=f"{prefix}_").order_by("id").values_list(
+            "id", flat=True))
+
+    def create_recipes(self, rng, prefix, users, count):
+        self.bulk_create(Recipe, (
+            Recipe(
+                author_id=rng.choice(users),
+                name=f"{prefix} рецепт {number}",
+                text=f"Описание тестового рецепта {number}.",
+                cooking_time=rng.randint(5, 180))
+            for number in range(count)))
+        return list(Recipe.objects.filter(
+            author_id__in=users).order_by("id").values_list("id", flat=True))
+
+    def create_links(self, rng, recipes, tags, ingredients, per_recipe):
+        """Создание ингредиентов и тегов рецептов."""
+        self.bulk_create(RecipeIngredients, (
+            RecipeIngredients(
+                recipe_id=recipe, ingredient_id=ingredient,
+                amount=rng.randint(1, 500))
+            for recipe in recipes
+            for ingredient in rng.sample(ingredients, per_recipe)))
+        self.bulk_create(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+            for recipe in recipes
+            for tag in rng.sample(tags, rng.randint(1, len(tags)))))
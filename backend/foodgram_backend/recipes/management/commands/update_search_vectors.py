@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import update_search_vector
+
+
+class Command(BaseCommand):
+    help = "Пересчет поисковых векторов рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=5000,
+            help="Количество рецептов, обновляемых одним запросом.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        ids = Recipe.objects.order_by("id").values_list("id", flat=True)
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(ids.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            updated += update_search_vector(
+                Recipe.objects.filter(id__range=(batch[0], batch[-1])))
+            last_id = batch[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f"Поисковые векторы обновлены: {updated}."))
@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 from .validators import hex_color_validator
 
@@ -43,6 +46,9 @@ class Ingredient(models.Model):
 
     class Meta:
         ordering = ("name",)
+        indexes = (
+            models.Index(fields=("name", "measurement_unit"),
+                         name="ingredient_name_unit"),)
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
 
@@ -66,6 +72,11 @@ class Recipe(models.Model):
         blank=True,
         null=True,
         verbose_name="Изображение")
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Варианты изображения")
     text = models.TextField(
         blank=True,
         null=True,
@@ -87,9 +98,32 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Дата публикации рецепта")
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения рецепта")
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        verbose_name="Количество добавлений в избранное")
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество добавлений в список покупок")
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="Поисковый вектор")
 
     class Meta:
         ordering = ("-pub_date",)
+        indexes = (
+            models.Index(fields=("-pub_date", "-id"),
+                         name="recipe_pub_date_id"),
+            models.Index(fields=("author", "-pub_date", "-id"),
+                         name="recipe_author_pub_date"),
+            models.Index(Lower("name"), name="recipe_lower_name"),)
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
 
@@ -168,6 +202,9 @@ class Favorite(models.Model):
             models.UniqueConstraint(
                 fields=("user", "recipe"),
                 name="unique_favorite_recipe"),)
+        indexes = (
+            models.Index(fields=("recipe", "user"),
+                         name="favorite_recipe_user"),)
 
     def __str__(self):
         return f"Рецепт {self.recipe} добавлен в избранное к {self.user}"
@@ -194,6 +231,120 @@ class ShoppingList(models.Model):
             models.UniqueConstraint(
                 fields=("user", "recipe"),
                 name="unique_shopping_list"),)
+        indexes = (
+            models.Index(fields=("recipe", "user"),
+                         name="shopping_list_recipe_user"),)
 
     def __str__(self):
         return f"Рецепт {self.recipe} добавлен в список покупок к {self.user}"
+
+
+class BackgroundJob(models.Model):
+    """Базовая модель задачи фоновой очереди в БД."""
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+    STATUSES = [
+        (PENDING, "В очереди"),
+        (PROCESSING, "Обрабатывается"),
+        (DONE, "Готово"),
+        (FAILED, "Ошибка"),
+    ]
+    status = models.CharField(
+        max_length=20,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name="Статус")
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Количество попыток")
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Не раньше")
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Начало обработки")
+    last_error = models.TextField(
+        blank=True,
+        verbose_name="Последняя ошибка")
+
+    class Meta:
+        abstract = True
+        ordering = ("id",)
+
+
+class ImageJob(BackgroundJob):
+    """Модель задачи фоновой обработки изображения рецепта."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="image_jobs",
+        verbose_name="Рецепт")
+
+    class Meta(BackgroundJob.Meta):
+        indexes = (
+            models.Index(fields=("status", "run_after"),
+                         name="imagejob_status_run_after"),)
+        verbose_name = "Обработка изображения"
+        verbose_name_plural = "Обработка изображений"
+
+    def __str__(self):
+        return f"Изображение рецепта {self.recipe_id}: {self.status}"
+
+
+class FeedItem(models.Model):
+    """Модель записи персональной ленты рецептов из подписок."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_items",
+        verbose_name="Подписчик")
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_items",
+        verbose_name="Рецепт")
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор рецепта")
+    pub_date = models.DateTimeField(
+        verbose_name="Дата публикации рецепта")
+
+    class Meta:
+        ordering = ("-pub_date", "-recipe_id")
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "recipe"),
+                name="unique_feed_item"),)
+        indexes = (
+            models.Index(fields=("user", "-pub_date", "-recipe"),
+                         name="feeditem_user_pub_date"),)
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Лента подписок"
+
+    def __str__(self):
+        return f"Рецепт {self.recipe_id} в ленте {self.user_id}"
+
+
+class FeedJob(BackgroundJob):
+    """Модель задачи рассылки нового рецепта в ленты подписчиков."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_jobs",
+        verbose_name="Рецепт")
+
+    class Meta(BackgroundJob.Meta):
+        indexes = (
+            models.Index(fields=("status", "run_after"),
+                         name="feedjob_status_run_after"),)
+        verbose_name = "Рассылка в ленты"
+        verbose_name_plural = "Рассылка в ленты"
+
+    def __str__(self):
+        return f"Рассылка рецепта {self.recipe_id}: {self.status}"
@@ -0,0 +1,51 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connections
+from django.db.models import F, OuterRef, Q, Subquery
+
+from .models import Recipe, RecipeIngredients
+
+SEARCH_CONFIG = "russian"
+
+
+def is_postgresql(queryset):
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def search_vector_expression():
+    """Выражение поискового вектора: название, описание и ингредиенты."""
+    ingredient_names = Subquery(
+        RecipeIngredients.objects.filter(
+            recipe=OuterRef("pk")).order_by().values("recipe").annotate(
+            names=StringAgg("ingredient__name", " ")).values("names"))
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("text", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(ingredient_names, weight="C", config=SEARCH_CONFIG))
+
+
+def update_search_vector(recipes=None):
+    """Метод пересчета поискового вектора для queryset рецептов."""
+    if recipes is None:
+        recipes = Recipe.objects.all()
+    if not is_postgresql(recipes):
+        return 0
+    return recipes.update(search_vector=search_vector_expression())
+
+
+def search_recipes(queryset, text):
+    """Метод полнотекстового поиска рецептов с ранжированием.
+
+    На PostgreSQL используется GIN-индекс по search_vector,
+    на остальных СУБД - регистронезависимый поиск по подстроке.
+    """
+    if not is_postgresql(queryset):
+        return queryset.filter(
+            Q(name__icontains=text)
+            | Q(text__icontains=text)
+            | Q(ingredients__name__icontains=text)).distinct()
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F("search_vector"), query)).order_by(
+        "-rank", "-pub_date", "-id")
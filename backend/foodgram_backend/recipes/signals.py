@@ -0,0 +1,160 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .counters import change_counter
+from .feed import add_author_to_feed, fan_out_recipe, remove_author_from_feed
+from .images import process_recipe_image
+from .indexes import ingredient_index, recipe_ingredient_index
+from .jobs import enqueue_feed_job, enqueue_image_job
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredients,
+                     ShoppingList, Subscription, Tag)
+
+User = get_user_model()
+
+RECIPE_COUNTERS = {
+    Favorite: "favorites_count",
+    ShoppingList: "shopping_cart_count",
+}
+
+
+def touch_recipes(recipes):
+    """Обновление даты изменения рецептов без вызова сигналов."""
+    recipes.update(updated_at=timezone.now())
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def reset_ingredient_index(sender, **kwargs):
+    """Сброс префиксного индекса после изменения ингредиентов."""
+    transaction.on_commit(ingredient_index.invalidate)
+
+
+@receiver(post_save, sender=RecipeIngredients)
+def add_recipe_ingredient(sender, instance, **kwargs):
+    """Добавление ингредиента рецепта в инвертированный индекс."""
+    transaction.on_commit(lambda: recipe_ingredient_index.add(
+        instance.recipe_id, instance.ingredient_id))
+
+
+@receiver(post_delete, sender=RecipeIngredients)
+def discard_recipe_ingredient(sender, instance, **kwargs):
+    """Удаление ингредиента рецепта из инвертированного индекса."""
+    transaction.on_commit(lambda: recipe_ingredient_index.discard(
+        instance.recipe_id, instance.ingredient_id))
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_index(sender, instance, **kwargs):
+    """Удаление рецепта из инвертированного индекса."""
+    transaction.on_commit(
+        lambda: recipe_ingredient_index.remove_recipe(instance.pk))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipe_on_tags(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Обновление даты изменения рецептов после изменения тегов."""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif pk_set:
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Tag)
+def touch_recipes_on_tag(sender, instance, created, **kwargs):
+    """Обновление даты изменения рецептов с измененным тегом."""
+    if not created:
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_on_ingredient(sender, instance, created, **kwargs):
+    """Обновление даты изменения рецептов с измененным ингредиентом."""
+    if not created:
+        touch_recipes(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(post_save, sender=User)
+def touch_recipes_on_author(sender, instance, created, update_fields=None,
+                            **kwargs):
+    """Обновление даты изменения рецептов после изменения автора."""
+    if created or (
+            update_fields
+            and set(update_fields) <= {"last_login", "password"}):
+        return
+    touch_recipes(Recipe.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Recipe)
+def process_image(sender, instance, update_fields=None, **kwargs):
+    """Обработка изображения после загрузки нового файла."""
+    if update_fields and "image" not in update_fields:
+        return
+    if instance.image.name == instance.image_variants.get("source"):
+        return
+    if settings.IMAGE_PROCESSING_ASYNC:
+        enqueue_image_job(instance)
+    else:
+        process_recipe_image(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, **kwargs):
+    """Добавление нового рецепта в ленты подписчиков автора."""
+    if not created:
+        return
+    if settings.FEED_FANOUT_ASYNC:
+        enqueue_feed_job(instance)
+    else:
+        transaction.on_commit(lambda: fan_out_recipe(instance))
+
+
+@receiver(post_save, sender=Subscription)
+def add_subscription_to_feed(sender, instance, created, **kwargs):
+    """Добавление рецептов автора в ленту нового подписчика."""
+    if created:
+        transaction.on_commit(lambda: add_author_to_feed(
+            instance.user_id, instance.subscribing_id))
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_subscription_from_feed(sender, instance, **kwargs):
+    """Удаление рецептов автора из ленты после отписки."""
+    transaction.on_commit(lambda: remove_author_from_feed(
+        instance.user_id, instance.subscribing_id))
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, raw=False,
+                            **kwargs):
+    """Увеличение счетчика рецептов автора."""
+    if created and not raw:
+        change_counter(User, instance.author_id, "recipes_count", 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    """Уменьшение счетчика рецептов автора, в том числе каскадное."""
+    change_counter(User, instance.author_id, "recipes_count", -1)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+def increment_recipe_counter(sender, instance, created, raw=False,
+                             **kwargs):
+    """Увеличение счетчика избранного или списка покупок рецепта."""
+    if created and not raw:
+        change_counter(
+            Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingList)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    """Уменьшение счетчика избранного или списка покупок рецепта."""
+    change_counter(Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], -1)
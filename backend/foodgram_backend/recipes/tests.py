@@ -0,0 +1,372 @@
+import base64
+import json
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from rest_framework import serializers
+
+from api.cache import RECIPES, get_versions
+from .feed import trim_feeds
+from .fields import decode_base64_image
+from .images import get_image_status, process_recipe_image
+from .indexes import IngredientPrefixIndex
+from .models import (Favorite, FeedItem, FeedJob, Ingredient, Recipe,
+                     ShoppingList, Subscription, Tag)
+
+User = get_user_model()
+
+
+def recipe_line(name, tags, email="cook@example.com", username="cook"):
+    return json.dumps({
+        "name": name,
+        "text": "Описание рецепта",
+        "cooking_time": 10,
+        "pub_date": "2024-01-01T00:00:00+00:00",
+        "image": None,
+        "author": {"email": email, "username": username,
+                   "first_name": "Иван", "last_name": "Иванов"},
+        "tags": tags,
+        "ingredients": [
+            {"name": "Соль", "measurement_unit": "г", "amount": 5}],
+    }, ensure_ascii=False)
+
+
+class ImportRecipesTest(TestCase):
+
+    def import_lines(self, *lines):
+        with tempfile.NamedTemporaryFile(
+                "w", suffix=".jsonl", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+            file.flush()
+            output = StringIO()
+            call_command("import_recipes", input=file.name, stdout=output,
+                         stderr=StringIO())
+        return output.getvalue()
+
+    def test_duplicates_in_batch_are_skipped(self):
+        output = self.import_lines(
+            recipe_line("Суп", []), recipe_line("Суп", []),
+            recipe_line("Каша", []))
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertIn("Рецепты загружены: 2", output)
+        self.assertIn("пропущено существующих и повторных: 1", output)
+
+    def test_missing_tags_are_created(self):
+        self.import_lines(recipe_line("Суп", [
+            {"slug": "lunch", "name": "Обед", "color": "#49B64E"}]))
+        tag = Tag.objects.get(slug="lunch")
+        self.assertEqual(tag.name, "Обед")
+        self.assertQuerysetEqual(
+            Recipe.objects.get(name="Суп").tags.all(), [tag])
+
+    def test_unknown_tag_slug_fails(self):
+        with self.assertRaises(CommandError):
+            self.import_lines(recipe_line("Суп", ["lunch"]))
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_feeds_index_and_cache_are_updated(self):
+        author = User.objects.create_user(
+            username="cook", email="cook@example.com", password="pass",
+            first_name="Иван", last_name="Иванов")
+        reader = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass",
+            first_name="Анна", last_name="Иванова")
+        Subscription.objects.create(user=reader, subscribing=author)
+        version = get_versions(RECIPES)
+        with mock.patch(
+                "recipes.management.commands.import_recipes."
+                "recipe_ingredient_index") as index:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.import_lines(recipe_line("Суп", []))
+        recipe = Recipe.objects.get(name="Суп")
+        self.assertQuerysetEqual(
+            FeedItem.objects.filter(user=reader).values_list(
+                "recipe_id", flat=True), [recipe.pk])
+        index.set_recipe.assert_called_once_with(
+            recipe.pk, [Ingredient.objects.get(name="Соль").pk])
+        self.assertNotEqual(get_versions(RECIPES), version)
+
+    def test_author_with_taken_username(self):
+        User.objects.create_user(
+            username="cook", email="other@example.com", password="pass",
+            first_name="Петр", last_name="Петров")
+        self.import_lines(recipe_line("Суп", []))
+        author = Recipe.objects.get(name="Суп").author
+        self.assertEqual(author.email, "cook@example.com")
+        self.assertEqual(author.username, "cook-1")
+
+
+class DecodeBase64ImageTest(SimpleTestCase):
+
+    def setUp(self):
+        image = BytesIO()
+        Image.new("RGB", (64, 64), (200, 100, 50)).save(image, "PNG")
+        self.content = image.getvalue()
+        self.encoded = base64.b64encode(self.content).decode()
+
+    def decode(self, encoded, max_size=10 ** 6):
+        marker = "data:image/png;base64,"
+        return decode_base64_image(marker + encoded, len(marker), max_size)
+
+    def test_line_breaks_are_ignored(self):
+        wrapped = "\r\n".join(
+            self.encoded[position:position + 76]
+            for position in range(0, len(self.encoded), 76))
+        self.assertEqual(self.decode(wrapped + "\n").read(), self.content)
+
+    def test_size_limit(self):
+        with self.assertRaises(serializers.ValidationError):
+            self.decode(self.encoded, max_size=len(self.content) - 1)
+
+    def test_truncated_payload(self):
+        with self.assertRaises(serializers.ValidationError):
+            self.decode(self.encoded[:-1])
+
+
+class SeedDataTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ингредиент {number}", measurement_unit="г")
+            for number in range(10))
+
+    def seed(self, *args):
+        call_command(
+            "seed_data", "--users=5", "--recipes=20", "--favorites=30",
+            "--carts=10", "--subscriptions=8", *args, stdout=StringIO())
+
+    def test_counts_and_counters(self):
+        self.seed()
+        self.assertEqual(
+            User.objects.filter(username__startswith="seed_").count(), 5)
+        self.assertEqual(Recipe.objects.count(), 20)
+        self.assertEqual(Favorite.objects.count(), 30)
+        recipe = Recipe.objects.order_by("-favorites_count").first()
+        self.assertEqual(recipe.favorites_count,
+                         Favorite.objects.filter(recipe=recipe).count())
+
+    def test_existing_prefix_requires_clear(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed("--clear")
+        self.assertEqual(Recipe.objects.count(), 20)
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=True)
+class ProcessRecipeImageTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        author = User.objects.create_user(
+            username="cook", email="cook@example.com", password="pass",
+            first_name="Иван", last_name="Иванов")
+        self.recipe = Recipe.objects.create(
+            author=author, name="Суп", text="Описание рецепта",
+            cooking_time=10, image=self.save_image("old.png", (200, 0, 0)))
+
+    def save_image(self, name, color):
+        image = BytesIO()
+        Image.new("RGB", (64, 64), color).save(image, "PNG")
+        return default_storage.save(
+            f"recipes/{name}", ContentFile(image.getvalue()))
+
+    def test_image_is_processed(self):
+        old_name = self.recipe.image.name
+        process_recipe_image(self.recipe)
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.image.name, old_name)
+        self.assertEqual(get_image_status(self.recipe), "ready")
+        self.assertFalse(default_storage.exists(old_name))
+
+    def test_new_upload_is_not_overwritten(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        old_name = recipe.image.name
+        new_name = self.save_image("new.png", (0, 200, 0))
+        Recipe.objects.filter(pk=recipe.pk).update(image=new_name)
+
+        process_recipe_image(recipe)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, new_name)
+        self.assertEqual(get_image_status(self.recipe), "pending")
+        self.assertTrue(default_storage.exists(old_name))
+        self.assertEqual(
+            sorted(default_storage.listdir("recipes")[1]),
+            ["new.png", "old.png"])
+        self.assertEqual(default_storage.listdir("recipes/variants")[1], [])
+
+
+@override_settings(FEED_FANOUT_ASYNC=False, FEED_MAX_LENGTH=3)
+class FeedTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass",
+            first_name="Петр", last_name="Петров")
+        cls.followers = [
+            User.objects.create_user(
+                username=f"reader{number}",
+                email=f"reader{number}@example.com", password="pass",
+                first_name="Иван", last_name="Иванов")
+            for number in range(3)]
+        Subscription.objects.bulk_create(
+            Subscription(user=user, subscribing=cls.author)
+            for user in cls.followers)
+
+    def publish(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [
+                Recipe.objects.create(
+                    author=self.author, name=f"Рецепт {number}",
+                    text="Описание рецепта", cooking_time=10)
+                for number in range(Recipe.objects.count(),
+                                    Recipe.objects.count() + count)]
+
+    def feed(self, user):
+        return list(FeedItem.objects.filter(user=user).values_list(
+            "recipe_id", flat=True))
+
+    def newest(self, count):
+        return list(Recipe.objects.order_by(
+            "-pub_date", "-id").values_list("id", flat=True)[:count])
+
+    def test_fan_out(self):
+        recipe = self.publish(1)[0]
+        for user in self.followers:
+            self.assertEqual(self.feed(user), [recipe.pk])
+
+    @override_settings(FEED_FANOUT_ASYNC=True)
+    def test_fan_out_job(self):
+        recipe = self.publish(1)[0]
+        self.assertFalse(FeedItem.objects.exists())
+        job = FeedJob.objects.get(recipe=recipe)
+        call_command("run_feed_workers", "--once", stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, FeedJob.DONE)
+        self.assertEqual(
+            FeedItem.objects.filter(recipe=recipe).count(),
+            len(self.followers))
+
+    def test_feeds_are_trimmed(self):
+        self.publish(5)
+        for user in self.followers:
+            self.assertEqual(self.feed(user), self.newest(3))
+
+    def test_trim_skips_short_feeds(self):
+        self.publish(2)
+        with self.assertNumQueries(1):
+            trim_feeds([user.pk for user in self.followers])
+
+    def test_subscribe_and_unsubscribe(self):
+        self.publish(4)
+        reader = User.objects.create_user(
+            username="newcomer", email="newcomer@example.com",
+            password="pass", first_name="Анна", last_name="Иванова")
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription = Subscription.objects.create(
+                user=reader, subscribing=self.author)
+        self.assertEqual(self.feed(reader), self.newest(3))
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.delete()
+        self.assertEqual(self.feed(reader), [])
+
+    def test_rebuild_feeds(self):
+        self.publish(4)
+        FeedItem.objects.filter(user=self.followers[0]).delete()
+        Subscription.objects.filter(user=self.followers[1]).delete()
+        call_command("rebuild_feeds", stdout=StringIO())
+        self.assertEqual(self.feed(self.followers[0]), self.newest(3))
+        self.assertEqual(self.feed(self.followers[1]), [])
+        self.assertEqual(self.feed(self.followers[2]), self.newest(3))
+
+
+class IngredientPrefixIndexTest(TestCase):
+
+    def setUp(self):
+        Ingredient.objects.create(name="Абрикос", measurement_unit="г")
+        self.index = IngredientPrefixIndex()
+
+    def names(self, prefix):
+        return [row["name"] for row in self.index.search(prefix)]
+
+    def test_stale_index_is_rebuilt_in_background(self):
+        self.assertEqual(self.names("а"), ["Абрикос"])
+        Ingredient.objects.create(name="Авокадо", measurement_unit="шт")
+        self.index.invalidate()
+        with mock.patch("recipes.indexes.threading.Thread") as thread:
+            self.assertEqual(self.names("а"), ["Абрикос"])
+            self.assertEqual(self.names("а"), ["Абрикос"])
+        thread.assert_called_once()
+        thread.call_args.kwargs["target"]()
+        self.assertEqual(self.names("а"), ["Абрикос", "Авокадо"])
+
+    def test_invalidation_during_build_keeps_index_stale(self):
+        load = self.index._load
+
+        def load_and_invalidate():
+            snapshot = load()
+            self.index.invalidate()
+            return snapshot
+
+        with mock.patch.object(self.index, "_load", load_and_invalidate):
+            self.names("а")
+        with mock.patch("recipes.indexes.threading.Thread") as thread:
+            self.names("а")
+        thread.assert_called_once()
+
+
+class CounterSignalsTest(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass",
+            first_name="Петр", last_name="Петров")
+        self.reader = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass",
+            first_name="Иван", last_name="Иванов")
+        self.recipe = Recipe.objects.create(
+            author=self.author, name="Суп", text="Описание рецепта",
+            cooking_time=10)
+
+    def counters(self):
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        return (self.author.recipes_count, self.recipe.favorites_count,
+                self.recipe.shopping_cart_count)
+
+    def test_favorite_and_cart(self):
+        favorite = Favorite.objects.create(
+            user=self.reader, recipe=self.recipe)
+        ShoppingList.objects.create(user=self.reader, recipe=self.recipe)
+        self.assertEqual(self.counters(), (1, 1, 1))
+        favorite.delete()
+        self.assertEqual(self.counters(), (1, 0, 1))
+
+    def test_cascade_from_deleted_user(self):
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        ShoppingList.objects.create(user=self.reader, recipe=self.recipe)
+        self.reader.delete()
+        self.assertEqual(self.counters(), (1, 0, 0))
+
+    def test_recipe_delete(self):
+        other = Recipe.objects.create(
+            author=self.author, name="Каша", text="Описание рецепта",
+            cooking_time=10)
+        self.assertEqual(self.counters()[0], 2)
+        other.delete()
+        self.assertEqual(self.counters()[0], 1)
@@ -32,6 +32,10 @@ class User(AbstractUser):
         verbose_name="Роль",
         default=USER,
         choices=USER_ROLES)
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество рецептов")
 
     class Meta:
         ordering = ("id",)